@@ -1,30 +1,17 @@
-import httpx
+import asyncio
 import base64
+import hashlib
 import os
 import json
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
+from http_clients import http_clients
+from analysis_cache import analysis_cache, sha256_digest, dhash
+from image_prep import image_preprocessor, sniff_mime
+from item_index import item_index
+from single_flight import SingleFlight
+from streaming_json import IncrementalJsonFields
 
-async def analyze_image_with_ai(image_bytes: bytes, api_key: str, base_url: str = "https://apis.iflow.cn/v1", model_name: str = "qwen3-vl-plus", custom_prompt: Optional[str] = None) -> dict:
-    """
-    Analyzes an image using the Qwen-VL-Plus model via OpenAI-compatible API.
-    Returns a JSON object with:
-    - title (string)
-    - mutation (string or null)
-    - traits_count (integer)
-    - brainrot_type (string: 'Free' or 'Non-free')
-    - price_suggestion (number, optional)
-    """
-    
-    # Encode image to base64
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-    image_url = f"data:image/jpeg;base64,{base64_image}"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    default_prompt = """
+DEFAULT_PROMPT = """
     You are an AI assistant for the game 'Steal a Brainrot'. 
     Your task is to analyze a screenshot of a game item listing or inventory.
     Extract the following information and return it in valid JSON format.
@@ -62,8 +49,26 @@ async def analyze_image_with_ai(image_bytes: bytes, api_key: str, base_url: str
 
     Return ONLY the JSON object. Do not include markdown code blocks.
     """
-    
-    prompt = custom_prompt if custom_prompt else default_prompt
+
+# Streaming mode asks for the search fields first so the client can start
+# the market lookup before the long marketing title is generated
+STREAM_FIELD_ORDER = ["item_name", "mutation", "ms_rate", "clean_name", "traits_count", "brainrot_type", "price_suggestion", "title"]
+STREAM_ORDER_HINT = "\n    Output the JSON keys in this order: " + ", ".join(STREAM_FIELD_ORDER) + ".\n"
+
+# Identical uploads arriving together share one LLM call
+analysis_flights = SingleFlight()
+
+def _build_request(image_bytes: bytes, api_key: str, model_name: str, custom_prompt: Optional[str], mime_type: Optional[str]) -> Tuple[dict, dict]:
+    # Encode image to base64
+    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    image_url = f"data:{mime_type or sniff_mime(image_bytes)};base64,{base64_image}"
+
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+    prompt = custom_prompt if custom_prompt else DEFAULT_PROMPT
 
     payload = {
         "model": model_name,
@@ -85,33 +90,161 @@ async def analyze_image_with_ai(image_bytes: bytes, api_key: str, base_url: str
             }
         ]
     }
+    return headers, payload
+
+def _parse_content(content: str) -> dict:
+    # Clean up potential markdown code blocks
+    if content.startswith("```json"):
+        content = content.replace("```json", "").replace("```", "")
+    elif content.startswith("```"):
+        content = content.replace("```", "")
+    return json.loads(content.strip())
+
+def _error_result(e: Exception) -> dict:
+    # Fallback / Mock response for development if API fails
+    return {
+        "title": "Error Analyzing Image",
+        "mutation": None,
+        "traits_count": 0,
+        "brainrot_type": "Non-free",
+        "price_suggestion": 0,
+        "error": str(e)
+    }
+
+async def analyze_image_with_ai(image_bytes: bytes, api_key: str, base_url: str = "https://apis.iflow.cn/v1", model_name: str = "qwen3-vl-plus", custom_prompt: Optional[str] = None, mime_type: Optional[str] = None) -> dict:
+    """
+    Analyzes an image using the Qwen-VL-Plus model via OpenAI-compatible API.
+    Returns a JSON object with:
+    - title (string)
+    - mutation (string or null)
+    - traits_count (integer)
+    - brainrot_type (string: 'Free' or 'Non-free')
+    - price_suggestion (number, optional)
+    """
+
+    headers, payload = _build_request(image_bytes, api_key, model_name, custom_prompt, mime_type)
+
+    client = http_clients.get("llm")
+    try:
+        response = await client.post(f"{base_url}/chat/completions", headers=headers, json=payload, timeout=30.0)
+        if response.status_code != 200:
+            print(f"AI API Error Response: {response.text}")
+        response.raise_for_status()
+        result = response.json()
+        
+        content = result['choices'][0]['message']['content']
+        return _parse_content(content)
+        
+    except Exception as e:
+        print(f"Error calling AI API: {e}")
+        return _error_result(e)
+
+def with_resolution(result: dict) -> dict:
+    """Adds `resolved`: the dictionary item (canonical name, rarity, tree id, confidence) the model output maps to."""
+    if "error" not in result:
+        result["resolved"] = item_index().resolve_analysis(result)
+    return result
+
+def prompt_version(custom_prompt: Optional[str] = None) -> str:
+    prompt = custom_prompt if custom_prompt else DEFAULT_PROMPT
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(f"{base_url}/chat/completions", headers=headers, json=payload)
+async def analyze_image_cached(image_bytes: bytes, api_key: str, base_url: str, model_name: str, custom_prompt: Optional[str] = None) -> Tuple[dict, str]:
+    """
+    analyze_image_with_ai() behind the analysis cache. Returns (result,
+    "HIT" / "NEAR" / "MISS"). On a miss the upload is downscaled and
+    re-encoded before it is sent. Failed analyses are not cached.
+    """
+    scope = (model_name, prompt_version(custom_prompt))
+    digest = sha256_digest(image_bytes)
+    phash = await asyncio.to_thread(dhash, image_bytes) if analysis_cache.max_distance > 0 else None
+
+    cached, cache_status = analysis_cache.get(scope, digest, phash)
+    if cached is not None:
+        return with_resolution(cached), cache_status
+
+    async def analyze():
+        prepared = await image_preprocessor.prepare(image_bytes)
+        result = await analyze_image_with_ai(prepared.data, api_key, base_url, model_name, custom_prompt, prepared.mime)
+        if "error" not in result:
+            analysis_cache.put(scope, digest, phash, result)
+        return result
+
+    result = await analysis_flights.do((scope, digest), analyze)
+    return with_resolution(dict(result)), cache_status
+
+async def stream_analysis_with_ai(image_bytes: bytes, api_key: str, base_url: str, model_name: str, custom_prompt: Optional[str] = None, mime_type: Optional[str] = None) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Same request with stream=true. Yields ("field", (name, value)) for each
+    top-level field as soon as its value is complete, then ("result", dict)
+    with the whole object, or ("result", error dict) if the call fails.
+    """
+    headers, payload = _build_request(image_bytes, api_key, model_name, custom_prompt, mime_type)
+    payload["messages"][0]["content"][0]["text"] += STREAM_ORDER_HINT
+    payload["stream"] = True
+
+    parser = IncrementalJsonFields()
+    content = ""
+    client = http_clients.get("llm")
+    try:
+        async with client.stream("POST", f"{base_url}/chat/completions", headers=headers, json=payload, timeout=30.0) as response:
             if response.status_code != 200:
-                print(f"AI API Error Response: {response.text}")
+                body = await response.aread()
+                print(f"AI API Error Response: {body.decode('utf-8', 'replace')}")
             response.raise_for_status()
-            result = response.json()
-            
-            content = result['choices'][0]['message']['content']
-            
-            # Clean up potential markdown code blocks
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "")
-            elif content.startswith("```"):
-                content = content.replace("```", "")
-            
-            return json.loads(content.strip())
-            
-        except Exception as e:
-            print(f"Error calling AI API: {e}")
-            # Fallback / Mock response for development if API fails
-            return {
-                "title": "Error Analyzing Image",
-                "mutation": None,
-                "traits_count": 0,
-                "brainrot_type": "Non-free",
-                "price_suggestion": 0,
-                "error": str(e)
-            }
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                content += delta
+                for name, value in parser.feed(delta):
+                    yield "field", (name, value)
+        yield "result", parser.fields if parser.finished else _parse_content(content)
+    except Exception as e:
+        print(f"Error calling AI API: {e}")
+        yield "result", _error_result(e)
+
+async def analyze_image_stream(image_bytes: bytes, api_key: str, base_url: str, model_name: str, custom_prompt: Optional[str] = None) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming counterpart of analyze_image_cached(). Yields ("cache", status),
+    then fields as they complete, ("resolved", match) once item_name and mutation are in,
+    then ("result", dict). Cache hits replay every field at once, in
+    STREAM_FIELD_ORDER.
+    """
+    scope = (model_name, prompt_version(custom_prompt))
+    digest = sha256_digest(image_bytes)
+    phash = await asyncio.to_thread(dhash, image_bytes) if analysis_cache.max_distance > 0 else None
+
+    cached, cache_status = analysis_cache.get(scope, digest, phash)
+    yield "cache", cache_status
+    if cached is not None:
+        for name in sorted(cached, key=lambda k: STREAM_FIELD_ORDER.index(k) if k in STREAM_FIELD_ORDER else len(STREAM_FIELD_ORDER)):
+            yield "field", (name, cached[name])
+        result = with_resolution(cached)
+        yield "resolved", result["resolved"]
+        yield "result", result
+        return
+
+    prepared = await image_preprocessor.prepare(image_bytes)
+    seen = {}
+    async for event, data in stream_analysis_with_ai(prepared.data, api_key, base_url, model_name, custom_prompt, prepared.mime):
+        if event == "field":
+            yield event, data
+            seen[data[0]] = data[1]
+            # Resolve as soon as the search fields are in, ahead of the title
+            if "resolved" not in seen and "item_name" in seen and "mutation" in seen:
+                seen["resolved"] = item_index().resolve_analysis(seen)
+                yield "resolved", seen["resolved"]
+            continue
+        if "error" not in data:
+            analysis_cache.put(scope, digest, phash, data)
+            data = with_resolution(dict(data))
+            if "resolved" not in seen:
+                yield "resolved", data["resolved"]
+        yield event, data
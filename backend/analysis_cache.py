@@ -0,0 +1,148 @@
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+    PHASH_AVAILABLE = True
+except ImportError:
+    # Without Pillow only byte-identical uploads are matched
+    PHASH_AVAILABLE = False
+
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+# Max differing bits (of 64) for two screenshots to count as the same image.
+# Off by default: screenshots of the same game UI where only the item art or
+# text differs can hash within a few bits of each other, and a near hit then
+# returns another item's name, mutation and rate. Opt in with a small value
+# (1-2) only where uploads are known re-encodes of the same screenshots.
+ANALYSIS_CACHE_MAX_DISTANCE = int(os.getenv("ANALYSIS_CACHE_MAX_DISTANCE", "0"))
+
+# (64-bit dHash, (width, height) of the decoded image)
+PHash = Tuple[int, Tuple[int, int]]
+
+def sha256_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def dhash(image_bytes: bytes) -> Optional[PHash]:
+    """
+    64-bit difference hash: grayscale 9x8 thumbnail, one bit per
+    left/right brightness comparison, plus the image size. Re-encodes and
+    small UI changes move only a few bits. None if Pillow is missing or the
+    bytes are not a decodable image.
+    """
+    if not PHASH_AVAILABLE:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            size = img.size
+            img.draft("L", (64, 64))  # let JPEG decode at reduced size
+            pixels = list(img.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value, size
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class _Entry:
+    __slots__ = ("result", "phash", "stored_at")
+
+    def __init__(self, result: dict, phash: Optional[PHash]):
+        self.result = result
+        self.phash = phash
+        self.stored_at = time.monotonic()
+
+class AnalysisCache:
+    """
+    Parsed /analyze results keyed by (scope, sha256). `scope` is the model
+    and prompt version, so changing either never serves an old answer.
+    Lookups try the exact digest first, then (only if `max_distance` > 0)
+    the closest perceptual hash in the same scope among images of exactly
+    the same dimensions. Bounded by LRU size and TTL.
+    """
+
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_MAX_ENTRIES, ttl: float = ANALYSIS_CACHE_TTL, max_distance: int = ANALYSIS_CACHE_MAX_DISTANCE):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[Tuple[tuple, str], _Entry]" = OrderedDict()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.stored_at > self.ttl
+
+    def _nearest(self, scope: tuple, phash: PHash, now: float) -> Optional[Tuple[Tuple[tuple, str], _Entry]]:
+        best = None
+        best_distance = self.max_distance + 1
+        for key, entry in self._entries.items():
+            if key[0] != scope or entry.phash is None or entry.phash[1] != phash[1] or self._expired(entry, now):
+                continue
+            distance = hamming(phash[0], entry.phash[0])
+            if distance < best_distance:
+                best, best_distance = (key, entry), distance
+                if distance == 0:
+                    break
+        return best
+
+    def get(self, scope: tuple, digest: str, phash: Optional[PHash]) -> Tuple[Optional[dict], str]:
+        """(result copy or None, "HIT" / "NEAR" / "MISS")."""
+        now = time.monotonic()
+        key = (scope, digest)
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry, now):
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return dict(entry.result), "HIT"
+
+        if phash is not None and self.max_distance > 0:
+            nearest = self._nearest(scope, phash, now)
+            if nearest is not None:
+                self._entries.move_to_end(nearest[0])
+                self.near_hits += 1
+                return dict(nearest[1].result), "NEAR"
+
+        self.misses += 1
+        return None, "MISS"
+
+    def put(self, scope: tuple, digest: str, phash: Optional[PHash], result: dict):
+        key = (scope, digest)
+        self._entries[key] = _Entry(dict(result), phash)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "phash": PHASH_AVAILABLE and self.max_distance > 0
+        }
+
+analysis_cache = AnalysisCache()
@@ -1,9 +1,11 @@
 from fastapi import Security, HTTPException, Depends, status
 from fastapi.security.api_key import APIKeyHeader
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal
 from models import APIKey, UsageLog
+from key_cache import CachedKey, key_cache, usage_buffer
 
 API_KEY_NAME = "Authorization"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
@@ -15,9 +17,13 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 async def get_api_key(
     api_key_header: str = Security(api_key_header),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not api_key_header:
         raise HTTPException(
@@ -30,12 +36,24 @@ async def get_api_key(
     else:
         key_value = api_key_header
 
-    key_record = db.query(APIKey).filter(APIKey.key_value == key_value).first()
-
-    if not key_record:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API Key"
-        )
+    # Validated keys are served from memory; the DB is only read on a miss
+    key_record = key_cache.get(key_value)
+    attempts = 2
+    while key_record is None:
+        generation = key_cache.generation
+        db_record = (await db.execute(
+            select(APIKey).where(APIKey.key_value == key_value).execution_options(populate_existing=True)
+        )).scalars().first()
+        if not db_record:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API Key"
+            )
+        key_record = CachedKey.from_record(db_record)
+        attempts -= 1
+        if not key_cache.put(key_record, generation) and attempts:
+            # A usage flush overlapped the read; read again in a fresh transaction
+            await db.rollback()
+            key_record = None
     
     if key_record.status != "active":
         raise HTTPException(
@@ -47,9 +65,8 @@ async def get_api_key(
             status_code=status.HTTP_403_FORBIDDEN, detail="API Key has expired"
         )
     
-    # Update usage stats
-    key_record.last_used_at = datetime.utcnow()
-    key_record.usage_count += 1
-    db.commit()
+    # Update usage stats (buffered, written back in batches)
+    now = datetime.utcnow()
+    usage_buffer.record(key_record.id, now)
 
-    return key_record
+    return key_record.copy(last_used_at=now, usage_count=usage_buffer.usage_count(key_record))
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from ai_service import analyze_image_cached
+
+# Vision-model calls in flight across all keys, and per API key
+ANALYZE_GLOBAL_CONCURRENCY = int(os.getenv("ANALYZE_GLOBAL_CONCURRENCY", "16"))
+ANALYZE_PER_KEY_CONCURRENCY = int(os.getenv("ANALYZE_PER_KEY_CONCURRENCY", "4"))
+ANALYZE_BATCH_MAX_FILES = int(os.getenv("ANALYZE_BATCH_MAX_FILES", "100"))
+
+class AnalyzeLimiter:
+    """
+    Two-level semaphore: a caller needs a slot for its key and a global
+    slot. The key slot is taken first, so one big batch queues on its own
+    key instead of filling the global pool ahead of other users.
+    """
+
+    def __init__(self, global_limit: int = ANALYZE_GLOBAL_CONCURRENCY, per_key_limit: int = ANALYZE_PER_KEY_CONCURRENCY):
+        self.global_limit = global_limit
+        self.per_key_limit = per_key_limit
+        self._global = asyncio.Semaphore(global_limit)
+        self._per_key: Dict[int, asyncio.Semaphore] = {}
+        self._users: Dict[int, int] = {}
+        self.active = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, key_id: int):
+        semaphore = self._per_key.get(key_id)
+        if semaphore is None:
+            semaphore = self._per_key[key_id] = asyncio.Semaphore(self.per_key_limit)
+        self._users[key_id] = self._users.get(key_id, 0) + 1
+        self.waiting += 1
+        waiting = True
+        try:
+            async with semaphore:
+                async with self._global:
+                    self.waiting -= 1
+                    waiting = False
+                    self.active += 1
+                    try:
+                        yield
+                    finally:
+                        self.active -= 1
+        finally:
+            if waiting:
+                self.waiting -= 1
+            self._users[key_id] -= 1
+            if not self._users[key_id]:
+                # Last user of this key: drop its semaphore
+                del self._users[key_id]
+                del self._per_key[key_id]
+
+    def stats(self) -> dict:
+        return {
+            "global_limit": self.global_limit,
+            "per_key_limit": self.per_key_limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "keys": len(self._per_key)
+        }
+
+analyze_limiter = AnalyzeLimiter()
+
+class BatchItem:
+    def __init__(self, index: int, filename: Optional[str], content_type: Optional[str], contents: bytes):
+        self.index = index
+        self.filename = filename
+        self.content_type = content_type
+        self.contents = contents
+
+async def analyze_item(item: BatchItem, settings, key_id: int) -> dict:
+    """One batch entry -> {"index", "filename", "status", ...}; never raises."""
+    entry = {"index": item.index, "filename": item.filename}
+    if not (item.content_type or "").startswith("image/"):
+        entry.update(status="error", error="File must be an image")
+        return entry
+    try:
+        async with analyze_limiter.slot(key_id):
+            result, cache_status = await analyze_image_cached(
+                item.contents, settings.llm_api_key, settings.llm_base_url, settings.llm_model, settings.system_prompt
+            )
+    except Exception as e:
+        entry.update(status="error", error=str(e))
+        return entry
+    if "error" in result:
+        entry.update(status="error", error=result["error"], result=result)
+    else:
+        entry.update(status="ok", cache=cache_status, result=result)
+    return entry
+
+async def analyze_batch(items: List[BatchItem], settings, key_id: int) -> List[dict]:
+    """All entries, in input order."""
+    return await asyncio.gather(*(analyze_item(item, settings, key_id) for item in items))
+
+async def stream_batch(items: List[BatchItem], settings, key_id: int) -> AsyncIterator[str]:
+    """NDJSON lines in completion order (each carries its input index)."""
+    tasks = [asyncio.ensure_future(analyze_item(item, settings, key_id)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+    finally:
+        # Client went away: stop the remaining LLM calls
+        for task in tasks:
+            task.cancel()
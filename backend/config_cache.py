@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import upsert
+from models import Config, ConfigVersion
+
+DEFAULT_LLM_BASE_URL = "https://apis.iflow.cn/v1"
+DEFAULT_LLM_MODEL = "qwen3-vl-plus"
+DEFAULT_ADMIN_SECRET = "admin-secret-123"
+
+# How often a worker checks the shared version row. Writes made by this
+# worker are visible immediately; writes from other workers within this delay.
+VERSION_CHECK_INTERVAL = float(os.getenv("CONFIG_VERSION_CHECK_INTERVAL", "2"))
+
+class ConfigSnapshot:
+    """Typed, read-only view of every Config row at one version."""
+
+    def __init__(self, values: Dict[str, str], version: int):
+        self.values = values
+        self.version = version
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+    @property
+    def llm_api_key(self) -> str:
+        return self.values.get("LLM_API_KEY", "")
+
+    @property
+    def llm_base_url(self) -> str:
+        return self.values.get("LLM_BASE_URL", DEFAULT_LLM_BASE_URL)
+
+    @property
+    def llm_model(self) -> str:
+        return self.values.get("LLM_MODEL", DEFAULT_LLM_MODEL)
+
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return self.values.get("SYSTEM_PROMPT")
+
+    @property
+    def admin_secret(self) -> str:
+        return self.values.get("ADMIN_SECRET", DEFAULT_ADMIN_SECRET)
+
+class ConfigCache:
+    """
+    Serves Config from memory. All rows are loaded in one query and reloaded
+    only when the config_version row changes, which is checked at most every
+    VERSION_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_version(self, db: Session) -> int:
+        row = db.query(ConfigVersion.version).filter(ConfigVersion.id == 1).first()
+        return row[0] if row else 0
+
+    def _load(self, db: Session, version: int) -> ConfigSnapshot:
+        values = {key: value for key, value in db.query(Config.key, Config.value).all()}
+        return ConfigSnapshot(values, version)
+
+    def get(self, db: Session) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < self.check_interval:
+                return self._snapshot
+            version = self._read_version(db)
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(db, version)
+            self._checked_at = now
+            return self._snapshot
+
+    async def get_async(self, db: AsyncSession) -> ConfigSnapshot:
+        """Same as get(), for AsyncSession callers. Runs on the event loop, so
+        no lock: two requests racing a reload just both read the same rows."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        row = (await db.execute(select(ConfigVersion.version).where(ConfigVersion.id == 1))).first()
+        version = row[0] if row else 0
+        if snapshot is None or snapshot.version != version:
+            rows = (await db.execute(select(Config.key, Config.value))).all()
+            snapshot = ConfigSnapshot({key: value for key, value in rows}, version)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = now
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+config_cache = ConfigCache()
+
+def get_config_snapshot(db: Session) -> ConfigSnapshot:
+    return config_cache.get(db)
+
+async def get_config_snapshot_async(db: AsyncSession) -> ConfigSnapshot:
+    return await config_cache.get_async(db)
+
+def bump_config_version(db: Session):
+    """
+    Call inside the transaction that writes Config, before db.commit().
+    A single upsert, so two writers never both insert the row (SQLite
+    ignores SELECT ... FOR UPDATE).
+    """
+    db.execute(upsert(
+        db.get_bind().dialect.name, ConfigVersion,
+        {"id": 1, "version": 1},
+        ["id"],
+        lambda excluded: {"version": func.coalesce(ConfigVersion.version, 0) + 1}
+    ))
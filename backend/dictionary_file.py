@@ -0,0 +1,12 @@
+# One implementation for backend/ and brainrotBB/: shared/dictionary_file.py at the repo root
+import os
+import sys
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if _ROOT not in sys.path:
+    # Appended, so nothing at the repo root shadows installed packages
+    sys.path.append(_ROOT)
+
+from shared.dictionary_file import extract_object
+
+__all__ = ["extract_object"]
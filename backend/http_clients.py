@@ -0,0 +1,55 @@
+import os
+from typing import Dict
+
+import httpx
+
+# Connection pool tuning, shared by every upstream client
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Upstreams and whether they may use HTTP/2. The crawler is plain HTTP on
+# localhost, where HTTP/2 cannot be negotiated.
+UPSTREAMS = {
+    "llm": {"http2": True},
+    "crawler": {"http2": False}
+}
+
+class ClientRegistry:
+    """
+    One long-lived httpx.AsyncClient per upstream, so TCP/TLS connections are
+    kept alive and reused across requests. Created lazily, closed from the
+    app lifespan. Per-call timeouts are passed on each request.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            options = UPSTREAMS.get(name, {})
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE and options.get("http2", False),
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                ),
+                timeout=30.0
+            )
+            self._clients[name] = client
+        return client
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+http_clients = ClientRegistry()
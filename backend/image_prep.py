@@ -0,0 +1,144 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from typing import Dict
+
+try:
+    from PIL import Image, ImageChops, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Longest edge sent to the vision model; larger screenshots are downscaled
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1280"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+# Trim uniform borders / background around the item card before scaling
+IMAGE_CROP_CARD = os.getenv("IMAGE_CROP_CARD", "0").lower() in ("1", "true", "yes", "on")
+# A crop is only applied if it keeps at least this fraction of the image area
+IMAGE_CROP_MIN_AREA = float(os.getenv("IMAGE_CROP_MIN_AREA", "0.15"))
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def sniff_mime(image_bytes: bytes, default: str = "image/jpeg") -> str:
+    """MIME type from the file signature rather than the upload's claimed type."""
+    for signature, mime in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+class PreparedImage:
+    def __init__(self, data: bytes, mime: str, original_size: int, width: int = 0, height: int = 0, cropped: bool = False):
+        self.data = data
+        self.mime = mime
+        self.original_size = original_size
+        self.width = width
+        self.height = height
+        self.cropped = cropped
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_size - len(self.data)
+
+def crop_to_card(img):
+    """
+    Crops to the bounding box of everything that differs from the
+    background (sampled at the top-left corner), i.e. the item card inside a
+    screenshot with plain margins. Returns None if nothing useful was found.
+    """
+    background = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+    diff = ImageChops.difference(img, background).convert("L").point(lambda v: 255 if v > 24 else 0)
+    bbox = diff.getbbox()
+    if bbox is None:
+        return None
+    area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+    total = img.size[0] * img.size[1]
+    if area < total * IMAGE_CROP_MIN_AREA or area > total * 0.95:
+        return None
+    return img.crop(bbox)
+
+def prepare_image(image_bytes: bytes, max_edge: int = IMAGE_MAX_EDGE, quality: int = IMAGE_JPEG_QUALITY, crop: bool = IMAGE_CROP_CARD) -> PreparedImage:
+    """
+    Decodes, optionally crops, downscales to `max_edge` and re-encodes as
+    JPEG. Falls back to the original bytes (with a sniffed MIME type) when
+    Pillow is missing, the image cannot be decoded, or re-encoding does not
+    make it smaller.
+    """
+    original = PreparedImage(image_bytes, sniff_mime(image_bytes), len(image_bytes))
+    if not PIL_AVAILABLE:
+        return original
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft("RGB", (max_edge, max_edge))  # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                flattened = Image.new("RGB", img.size, (255, 255, 255))
+                flattened.paste(img, mask=img.split()[-1])
+                img = flattened
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            cropped = False
+            if crop:
+                card = crop_to_card(img)
+                if card is not None:
+                    img, cropped = card, True
+
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=quality, optimize=True)
+            data = out.getvalue()
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending original: {e}")
+        return original
+
+    if len(data) >= len(image_bytes) and not cropped:
+        original.width, original.height = img.size
+        return original
+    return PreparedImage(data, "image/jpeg", len(image_bytes), img.size[0], img.size[1], cropped)
+
+class ImagePreprocessor:
+    """Runs prepare_image() off the event loop and keeps size / timing totals."""
+
+    def __init__(self):
+        self.images = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cropped = 0
+        self.total_ms = 0.0
+
+    async def prepare(self, image_bytes: bytes) -> PreparedImage:
+        started = time.perf_counter()
+        # Pillow releases the GIL while decoding / resampling, so threads scale
+        prepared = await asyncio.to_thread(prepare_image, image_bytes)
+        self.images += 1
+        self.bytes_in += prepared.original_size
+        self.bytes_out += len(prepared.data)
+        self.cropped += prepared.cropped
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return prepared
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": PIL_AVAILABLE,
+            "images": self.images,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else 0.0,
+            "cropped": self.cropped,
+            "avg_ms": round(self.total_ms / self.images, 1) if self.images else 0.0
+        }
+
+image_preprocessor = ImagePreprocessor()
@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from dictionary_file import extract_object
+
+# Same file the scraper reads: rarity -> item -> tree id, plus attributes
+DICTIONARY_PATH = os.getenv(
+    "ELDORADO_DICTIONARY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "字典.txt")
+)
+# Optional JSON file {"alias": "Canonical Item Name"} merged over ITEM_ALIASES
+ITEM_ALIASES_PATH = os.getenv("ITEM_ALIASES_PATH")
+# Fuzzy matches below this are treated as unknown
+ITEM_MATCH_MIN_CONFIDENCE = float(os.getenv("ITEM_MATCH_MIN_CONFIDENCE", "0.6"))
+
+# Spellings the vision model is known to produce
+ITEM_ALIASES = {
+    "skibidi": "Skibidi Toilet",
+    "la vaca saturno saturnita": "La Vacca Saturno Saturnita",
+    "la vaca saturno": "La Vacca Saturno Saturnita",
+    "vacca saturno": "La Vacca Saturno Saturnita",
+    "graipus medusi": "Graipuss Medussi",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize(text: str) -> str:
+    """'Tralalero  Tralalà!' -> 'tralalero tralala'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+def trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ItemMatch:
+    def __init__(self, name: str, category: str, tree_id: str, confidence: float, method: str):
+        self.name = name
+        self.category = category
+        self.tree_id = tree_id
+        self.confidence = confidence
+        self.method = method
+
+    def to_dict(self) -> dict:
+        return {
+            "item_name": self.name,
+            "category": self.category,
+            "tree_id": self.tree_id,
+            "confidence": round(self.confidence, 3),
+            "method": self.method
+        }
+
+class ItemIndex:
+    """
+    Precomputed lookup over the Eldorado dictionary: normalized names,
+    space-free variants and aliases resolve exactly; anything else is ranked
+    by trigram Dice similarity through an inverted index, so only items that
+    share a trigram with the query are scored.
+    """
+
+    def __init__(self, items: Dict[str, Dict[str, str]], mutations: Dict[str, str], aliases: Dict[str, str]):
+        # entry = (name, category, tree_id, normalized, trigram set)
+        self.entries: List[Tuple[str, str, str, str, set]] = []
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        self.grams: Dict[str, List[int]] = defaultdict(list)
+        for category, names in items.items():
+            for name, tree_id in names.items():
+                if name == "Other":
+                    continue
+                normalized = normalize(name)
+                grams = trigrams(normalized)
+                index = len(self.entries)
+                self.entries.append((name, category, tree_id, normalized, grams))
+                self.exact[normalized].append(index)
+                self.exact[normalized.replace(" ", "")].append(index)
+                for gram in grams:
+                    self.grams[gram].append(index)
+
+        self.aliases: Dict[str, List[int]] = {}
+        for alias, canonical in aliases.items():
+            targets = self.exact.get(normalize(canonical))
+            if targets:
+                self.aliases[normalize(alias)] = targets
+
+        self.categories = {normalize(category): category for category in items}
+        self.mutations = {normalize(name): name for name in mutations if name != "None"}
+
+    def _pick(self, candidates: List[int], category: Optional[str]) -> int:
+        if category:
+            for index in candidates:
+                if self.entries[index][1] == category:
+                    return index
+        return candidates[0]
+
+    def _match(self, index: int, confidence: float, method: str) -> ItemMatch:
+        name, category, tree_id, _, _ = self.entries[index]
+        return ItemMatch(name, category, tree_id, confidence, method)
+
+    def resolve_category(self, text: Optional[str]) -> Optional[str]:
+        return self.categories.get(normalize(text)) if text else None
+
+    def resolve_mutation(self, text: Optional[str]) -> Optional[str]:
+        return self.mutations.get(normalize(text)) if text else None
+
+    def split_mutation(self, text: str) -> Tuple[Optional[str], str]:
+        """'Lava Skibidi Toilet' -> ('Lava', 'skibidi toilet')."""
+        normalized = normalize(text)
+        for key, name in self.mutations.items():
+            if normalized.startswith(key + " "):
+                return name, normalized[len(key) + 1:]
+        return None, normalized
+
+    def resolve(self, text: Optional[str], category: Optional[str] = None, min_confidence: float = ITEM_MATCH_MIN_CONFIDENCE) -> Optional[ItemMatch]:
+        """Best dictionary item for free text, or None below `min_confidence`."""
+        if not text:
+            return None
+        category = self.resolve_category(category)
+        normalized = normalize(text)
+        for key in (normalized, normalized.replace(" ", "")):
+            if key in self.exact:
+                return self._match(self._pick(self.exact[key], category), 1.0, "exact")
+        if normalized in self.aliases:
+            return self._match(self._pick(self.aliases[normalized], category), 0.95, "alias")
+
+        query = trigrams(normalized)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query:
+            for index in self.grams.get(gram, ()):
+                shared[index] += 1
+        best, best_score = None, 0.0
+        for index, count in shared.items():
+            score = 2.0 * count / (len(query) + len(self.entries[index][4]))
+            if category and self.entries[index][1] == category:
+                score += 0.01  # tie-break towards the requested rarity
+            if score > best_score:
+                best, best_score = index, score
+        if best is None or best_score < min_confidence:
+            return None
+        return self._match(best, min(best_score, 0.99), "fuzzy")
+
+    def resolve_analysis(self, result: dict) -> Optional[dict]:
+        """
+        Resolves an /analyze result: item_name first, then clean_name with
+        its mutation prefix split off. Returns the match plus the canonical
+        mutation, or None.
+        """
+        mutation = self.resolve_mutation(result.get("mutation"))
+        match = self.resolve(result.get("item_name"))
+        clean_name = result.get("clean_name")
+        if (match is None or match.confidence < 1.0) and clean_name:
+            prefix, rest = self.split_mutation(clean_name)
+            candidate = self.resolve(rest)
+            if candidate is not None and (match is None or candidate.confidence > match.confidence):
+                match = candidate
+            mutation = mutation or prefix
+        if match is None:
+            return None
+        resolved = match.to_dict()
+        resolved["mutation"] = mutation
+        return resolved
+
+@lru_cache(maxsize=1)
+def item_index() -> ItemIndex:
+    try:
+        with open(DICTIONARY_PATH, encoding="utf-8") as f:
+            text = f.read()
+        items = extract_object(text, "brainrotDictionary")
+        mutations = extract_object(text, "attributeDictionary").get("Mutations", {})
+    except (OSError, ValueError) as e:
+        # No dictionary: nothing resolves, filters pass through unchanged
+        print(f"Error loading item dictionary: {e}")
+        items, mutations = {}, {}
+    aliases = dict(ITEM_ALIASES)
+    if ITEM_ALIASES_PATH:
+        with open(ITEM_ALIASES_PATH, encoding="utf-8") as f:
+            aliases.update(json.load(f))
+    return ItemIndex(items, mutations, aliases)
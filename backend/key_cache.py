@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update, func, case
+
+from database import SessionLocal
+from models import APIKey
+
+logger = logging.getLogger(__name__)
+
+# How long a validated key is trusted before it is re-read from the database.
+# Admin changes made in this worker invalidate immediately; other workers see
+# them within this window.
+KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "30"))
+KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+# Buffered usage counters are written back this often (and on shutdown)
+USAGE_FLUSH_INTERVAL = float(os.getenv("API_KEY_USAGE_FLUSH_INTERVAL", "10"))
+
+_FIELDS = (
+    "id", "key_value", "user_identifier", "eldorado_email", "expiry_date",
+    "created_at", "last_used_at", "usage_count", "status"
+)
+
+class CachedKey:
+    """Detached copy of an APIKey row; has the same attributes as the model."""
+
+    def __init__(self, **values):
+        for field in _FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_record(cls, record: APIKey) -> "CachedKey":
+        return cls(**{field: getattr(record, field) for field in _FIELDS})
+
+    def copy(self, **changes) -> "CachedKey":
+        values = {field: getattr(self, field) for field in _FIELDS}
+        values.update(changes)
+        return CachedKey(**values)
+
+class KeyCache:
+    """
+    key_value -> CachedKey with a short TTL; least recently used keys are
+    evicted first.
+
+    `generation` is bumped whenever a usage flush starts or ends and on
+    invalidation. Callers read it before loading a row from the database
+    and pass it to put(); a row whose read overlapped a flush may or may not
+    include the flushed counts, so it is not cached. Each entry remembers the
+    generation it was stored at, which tells apply_flushed() whether the row
+    predates the flush.
+    """
+
+    def __init__(self, ttl: float = KEY_CACHE_TTL, maxsize: int = KEY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key_value -> (row, loaded_at, generation)
+        self._entries: "OrderedDict[str, Tuple[CachedKey, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def get(self, key_value: str) -> Optional[CachedKey]:
+        entry = self._entries.get(key_value)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        with self._lock:
+            if key_value in self._entries:
+                self._entries.move_to_end(key_value)
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key_value: str) -> Optional[CachedKey]:
+        """Cached row regardless of age, without touching counters or LRU order."""
+        entry = self._entries.get(key_value)
+        return entry[0] if entry else None
+
+    def put(self, cached: CachedKey, read_generation: int) -> bool:
+        """
+        Caches a row read from the database while `generation` was
+        `read_generation`. Returns False (and caches nothing) if a flush or
+        invalidation happened since, as the row may be stale.
+        """
+        with self._lock:
+            if read_generation != self.generation:
+                self.rejected += 1
+                return False
+            self._entries[cached.key_value] = (cached, time.monotonic(), self.generation)
+            self._entries.move_to_end(cached.key_value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            self.generation += 1
+            return self.generation
+
+    def invalidate_id(self, key_id: int):
+        with self._lock:
+            self.generation += 1
+            for key_value, (cached, _, _) in list(self._entries.items()):
+                if cached.id == key_id:
+                    del self._entries[key_value]
+
+    def apply_flushed(self, key_id: int, count: int, last_used_at: datetime, flush_generation: int):
+        """
+        Folds counts that were just written to the DB into rows cached before
+        the flush started (generation < `flush_generation`). Rows stored
+        since may already include them and are dropped instead.
+        """
+        with self._lock:
+            for key_value, (cached, loaded_at, generation) in list(self._entries.items()):
+                if cached.id != key_id:
+                    continue
+                if generation < flush_generation:
+                    self._entries[key_value] = (
+                        cached.copy(usage_count=(cached.usage_count or 0) + count, last_used_at=last_used_at),
+                        loaded_at,
+                        generation
+                    )
+                else:
+                    del self._entries[key_value]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "rejected": self.rejected}
+
+class UsageBuffer:
+    """
+    Collects usage_count / last_used_at bumps in memory and writes them in one
+    batched transaction per interval. The UPDATE adds to the stored count
+    rather than overwriting it, so several workers and restarts accumulate
+    correctly; pending counts are flushed on shutdown.
+
+    Pending counts stay in the buffer until their write has committed and
+    are then moved into the cached rows under one lock, so usage_count()
+    never misses them in between and a failed write loses nothing.
+    """
+
+    def __init__(self, cache: KeyCache, interval: float = USAGE_FLUSH_INTERVAL):
+        self.cache = cache
+        self.interval = interval
+        self._pending: Dict[int, list] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_rows = 0
+
+    def record(self, key_id: int, when: datetime):
+        with self._lock:
+            entry = self._pending.get(key_id)
+            if entry is None:
+                self._pending[key_id] = [1, when]
+            else:
+                entry[0] += 1
+                entry[1] = when
+
+    def usage_count(self, cached: CachedKey) -> int:
+        """Stored plus pending usage, read consistently with a concurrent flush."""
+        with self._lock:
+            current = self.cache.peek(cached.key_value) or cached
+            entry = self._pending.get(cached.id)
+            return (current.usage_count or 0) + (entry[0] if entry else 0)
+
+    def flush(self):
+        with self._lock:
+            batch = {key_id: tuple(entry) for key_id, entry in self._pending.items()}
+        if not batch:
+            return
+        # Rows cached from here on may or may not include this write
+        flush_generation = self.cache.bump_generation()
+        db = SessionLocal()
+        try:
+            for key_id, (count, last_used_at) in batch.items():
+                db.execute(
+                    update(APIKey)
+                    .where(APIKey.id == key_id)
+                    .values(
+                        usage_count=func.coalesce(APIKey.usage_count, 0) + count,
+                        last_used_at=case(
+                            (APIKey.last_used_at == None, last_used_at),  # noqa: E711
+                            (APIKey.last_used_at < last_used_at, last_used_at),
+                            else_=APIKey.last_used_at
+                        )
+                    )
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Counts are still pending; the next flush retries them
+            self.cache.bump_generation()
+            logger.error(f"Error flushing API key usage: {e}")
+            return
+        finally:
+            db.close()
+
+        self.flushed_rows += len(batch)
+        with self._lock:
+            for key_id, (count, last_used_at) in batch.items():
+                self.cache.apply_flushed(key_id, count, last_used_at, flush_generation)
+                entry = self._pending[key_id]
+                entry[0] -= count
+                if entry[0] <= 0:
+                    del self._pending[key_id]
+            # Reads that started during the flush are not cached
+            self.cache.bump_generation()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.flush)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {"pending_keys": len(self._pending), "flushed_rows": self.flushed_rows}
+
+key_cache = KeyCache()
+usage_buffer = UsageBuffer(key_cache)
@@ -1,22 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, Header
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+import json
 import uuid
 import secrets
 
-from database import engine, Base, SessionLocal
-from models import APIKey, Config
-from auth import get_api_key, get_db
-from ai_service import analyze_image_with_ai
-from market_service import fetch_market_prices
+from database import engine, async_engine, SessionLocal
+from migrations import run_migrations
+from models import APIKey, Config, UsageRollup
+from auth import get_api_key, get_db, get_async_db
+from ai_service import analyze_image_cached, analyze_image_stream
+from analysis_cache import analysis_cache
+from image_prep import image_preprocessor
+from pipeline import analyze_price_pipeline
+from batch_analyze import ANALYZE_BATCH_MAX_FILES, BatchItem, analyze_batch, analyze_limiter, stream_batch
+from market_service import fetch_market_prices, history_key, market_flights, resolve_filters
+from market_history import PERIODS, market_history
+from http_clients import http_clients
+from config_cache import get_config_snapshot, get_config_snapshot_async, bump_config_version, config_cache
+from key_cache import key_cache, usage_buffer
+from usage_events import usage_events
+from sqlalchemy import func
 from pydantic import BaseModel
 from typing import Optional, List
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Eldorado AI API")
+# Create / upgrade tables
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    usage_buffer.start()
+    usage_events.start()
+    market_history.start()
+    yield
+    # Write back buffered API key usage, queued usage events and price history before exiting
+    await market_history.stop()
+    await usage_events.stop()
+    await usage_buffer.stop()
+    # Close the pooled upstream connections (LLM provider, crawler)
+    await http_clients.aclose()
+    await async_engine.dispose()
+
+app = FastAPI(title="Eldorado AI API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,14 +93,43 @@ class ChangePasswordRequest(BaseModel):
     old_password: str
     new_password: str
 
+class UsageRollupResponse(BaseModel):
+    key_id: int
+    hour: datetime
+    action: str
+    count: int
+
+    class Config:
+        from_attributes = True
+
+class UsageSummaryResponse(BaseModel):
+    key_id: int
+    action: str
+    count: int
+
 # --- Admin Auth (Simple) ---
 def verify_admin(x_admin_secret: str = Header(..., alias="X-Admin-Secret"), db: Session = Depends(get_db)):
-    config_entry = db.query(Config).filter(Config.key == 'ADMIN_SECRET').first()
-    expected_secret = config_entry.value if config_entry else "admin-secret-123"
+    expected_secret = get_config_snapshot(db).admin_secret
     if x_admin_secret != expected_secret:
         raise HTTPException(status_code=403, detail="Not authorized")
     return True
 
+def client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def sse_analysis(contents: bytes, settings, key_id: int):
+    async with analyze_limiter.slot(key_id):
+        async for event, data in analyze_image_stream(contents, settings.llm_api_key, settings.llm_base_url, settings.llm_model, settings.system_prompt):
+            if event == "field":
+                yield sse_event("field", {"name": data[0], "value": data[1]})
+            elif event == "result" and "error" in data:
+                yield sse_event("error", data)
+            else:
+                yield sse_event(event, data)
+
 # --- Endpoints ---
 
 @app.get("/health")
@@ -79,7 +137,8 @@ def health_check():
     return {"status": "ok", "time": datetime.utcnow()}
 
 @app.get("/me", response_model=KeyResponse)
-def get_my_info(api_key: APIKey = Depends(get_api_key)):
+async def get_my_info(request: Request, api_key: APIKey = Depends(get_api_key)):
+    usage_events.emit(api_key.id, client_ip(request), "me")
     return api_key
 
 @app.post("/bind-email", response_model=KeyResponse)
@@ -91,42 +150,112 @@ def bind_eldorado_email(
     if api_key.eldorado_email:
         raise HTTPException(status_code=400, detail="Email already bound. Contact admin to change.")
     
-    api_key.eldorado_email = request.eldorado_email
+    # api_key is a cached copy; write through the DB row
+    db_key = db.query(APIKey).filter(APIKey.id == api_key.id).first()
+    db_key.eldorado_email = request.eldorado_email
     db.commit()
-    db.refresh(api_key)
-    return api_key
+    key_cache.invalidate_id(db_key.id)
+    db.refresh(db_key)
+    return db_key
 
 # Client Endpoint: Analyze Image
 @app.post("/analyze")
 async def analyze_image(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
+    stream: bool = False,
     api_key: APIKey = Depends(get_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    With stream=true the response is Server-Sent Events: `cache`, then one
+    `field` event per JSON field as soon as the model has written it
+    (item_name, mutation and ms_rate first), then `result` with the whole
+    object (or `error`).
+    """
     # Validate file type
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    config_entry = db.query(Config).filter(Config.key == 'LLM_API_KEY').first()
-    llm_key = config_entry.value if config_entry else ""
-    if not llm_key:
+    settings = await get_config_snapshot_async(db)
+    if not settings.llm_api_key:
         raise HTTPException(status_code=500, detail="LLM API key not configured")
 
-    base_url_entry = db.query(Config).filter(Config.key == 'LLM_BASE_URL').first()
-    model_entry = db.query(Config).filter(Config.key == 'LLM_MODEL').first()
-    prompt_entry = db.query(Config).filter(Config.key == 'SYSTEM_PROMPT').first()
+    usage_events.emit(api_key.id, client_ip(request), "analyze")
+    contents = await file.read()
+    if stream:
+        return StreamingResponse(
+            sse_analysis(contents, settings, api_key.id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    async with analyze_limiter.slot(api_key.id):
+        result, cache_status = await analyze_image_cached(contents, settings.llm_api_key, settings.llm_base_url, settings.llm_model, settings.system_prompt)
+    response.headers["X-Cache"] = cache_status
+    return result
+
+# Client Endpoint: Analyze many images in one request
+@app.post("/analyze/batch")
+async def analyze_images_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    stream: bool = False,
+    api_key: APIKey = Depends(get_api_key),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Analyzes every uploaded image, fanned out under the per-key and global
+    LLM limits. Returns one entry per file in input order, with a per-item
+    status / error. With stream=true, entries are sent as NDJSON lines as
+    they finish (each carries its input `index`).
+    """
+    if len(files) > ANALYZE_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYZE_BATCH_MAX_FILES} files per batch")
+
+    settings = await get_config_snapshot_async(db)
+    if not settings.llm_api_key:
+        raise HTTPException(status_code=500, detail="LLM API key not configured")
 
-    base_url = base_url_entry.value if base_url_entry else "https://apis.iflow.cn/v1"
-    model = model_entry.value if model_entry else "qwen3-vl-plus"
-    prompt = prompt_entry.value if prompt_entry else None
+    items = []
+    for index, file in enumerate(files):
+        items.append(BatchItem(index, file.filename, file.content_type, await file.read()))
+        usage_events.emit(api_key.id, client_ip(request), "analyze")
 
+    if stream:
+        return StreamingResponse(stream_batch(items, settings, api_key.id), media_type="application/x-ndjson")
+    return {"results": await analyze_batch(items, settings, api_key.id)}
+
+# Client Endpoint: Analyze + market prices in one call
+@app.post("/analyze/price")
+async def analyze_and_price(
+    request: Request,
+    file: UploadFile = File(...),
+    api_key: APIKey = Depends(get_api_key),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Analysis, cheapest competitor offers and a suggested price together.
+    The market lookup starts while the model is still writing, so the total
+    time is close to the slower of the two rather than their sum.
+    """
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    settings = await get_config_snapshot_async(db)
+    if not settings.llm_api_key:
+        raise HTTPException(status_code=500, detail="LLM API key not configured")
+
+    usage_events.emit(api_key.id, client_ip(request), "analyze")
+    usage_events.emit(api_key.id, client_ip(request), "market")
     contents = await file.read()
-    result = await analyze_image_with_ai(contents, llm_key, base_url, model, prompt)
-    return result
+    # The pipeline takes an analyze_limiter slot for the model call only
+    return await analyze_price_pipeline.run(contents, settings, api_key.id)
 
 # Client Endpoint: Market Prices
 @app.get("/market")
 async def get_market_prices(
+    request: Request,
     ms_rate: Optional[str] = None,
     mutations: Optional[str] = None,
     category: Optional[str] = None,
@@ -139,9 +268,41 @@ async def get_market_prices(
         "category": category,
         "item_name": item_name
     }
+    usage_events.emit(api_key.id, client_ip(request), "market")
     result = await fetch_market_prices(filters)
     return result
 
+@app.get("/market/history")
+async def get_market_history(
+    request: Request,
+    item_name: str,
+    mutations: Optional[str] = None,
+    ms_rate: Optional[str] = None,
+    category: Optional[str] = None,
+    period: str = "hour",
+    hours: int = 168,
+    api_key: APIKey = Depends(get_api_key),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Price trend of one item / mutation / M/s bucket from the rollups; never calls the crawler."""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    filters = {k: v for k, v in {"item_name": item_name, "mutations": mutations, "ms_rate": ms_rate, "category": category}.items() if v}
+    filters, resolved = resolve_filters(filters)
+    key = history_key(filters, resolved)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Unknown item, mutation or M/s rate")
+    usage_events.emit(api_key.id, client_ip(request), "market_history")
+    points = await market_history.series(db, key, period, datetime.utcnow() - timedelta(hours=hours))
+    return {
+        "item_name": key[0],
+        "mutation": key[1],
+        "ms_bucket": key[2],
+        "period": period,
+        "resolved": resolved,
+        "points": points
+    }
+
 # Admin Endpoints
 
 @app.post("/admin/login")
@@ -161,7 +322,9 @@ def change_admin_password(req: ChangePasswordRequest, db: Session = Depends(get_
         db.add(config_entry)
     else:
         config_entry.value = req.new_password
+    bump_config_version(db)
     db.commit()
+    config_cache.invalidate()
     return {"status": "ok", "message": "Password changed successfully"}
 
 @app.post("/admin/keys", response_model=KeyResponse)
@@ -204,6 +367,7 @@ def update_key(key_id: int, key_update: KeyUpdate, db: Session = Depends(get_db)
         db_key.eldorado_email = key_update.eldorado_email if key_update.eldorado_email.strip() else None
 
     db.commit()
+    key_cache.invalidate_id(db_key.id)
     db.refresh(db_key)
     return db_key
 
@@ -217,6 +381,7 @@ def delete_key(key_id: int, db: Session = Depends(get_db), _admin: bool = Depend
     # Let's just ban it as per requirements "Ban/Unban".
     db_key.status = "banned"
     db.commit()
+    key_cache.invalidate_id(db_key.id)
     return {"message": "Key banned"}
 
 @app.get("/admin/config", response_model=List[ConfigResponse])
@@ -233,30 +398,66 @@ def update_config(config_key: str, update_data: ConfigUpdate, db: Session = Depe
     else:
         config_entry.value = update_data.value
     
+    bump_config_version(db)
     db.commit()
+    config_cache.invalidate()
     db.refresh(config_entry)
     return config_entry
 
-import httpx
+@app.get("/admin/stats")
+def get_service_stats(_admin: bool = Depends(verify_admin)):
+    return {
+        "single_flight": market_flights.stats(),
+        "key_cache": key_cache.stats(),
+        "usage_buffer": usage_buffer.stats(),
+        "usage_events": usage_events.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "image_prep": image_preprocessor.stats(),
+        "analyze_limiter": analyze_limiter.stats(),
+        "pipeline": analyze_price_pipeline.stats(),
+        "market_history": market_history.stats()
+    }
+
+@app.get("/admin/usage", response_model=List[UsageRollupResponse])
+def get_usage_history(key_id: Optional[int] = None, hours: int = 24, db: Session = Depends(get_db), _admin: bool = Depends(verify_admin)):
+    """Hourly request counts from the rollup table (newest first)."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    query = db.query(UsageRollup).filter(UsageRollup.hour >= since)
+    if key_id is not None:
+        query = query.filter(UsageRollup.key_id == key_id)
+    return query.order_by(UsageRollup.hour.desc(), UsageRollup.key_id).all()
+
+@app.get("/admin/usage/summary", response_model=List[UsageSummaryResponse])
+def get_usage_summary(hours: int = 24, db: Session = Depends(get_db), _admin: bool = Depends(verify_admin)):
+    """Per-key totals over the last `hours`, summed from hourly rollups."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = (
+        db.query(UsageRollup.key_id, UsageRollup.action, func.sum(UsageRollup.count))
+        .filter(UsageRollup.hour >= since)
+        .group_by(UsageRollup.key_id, UsageRollup.action)
+        .order_by(func.sum(UsageRollup.count).desc())
+        .all()
+    )
+    return [{"key_id": key_id, "action": action, "count": count} for key_id, action, count in rows]
+
 @app.get("/admin/llm-status")
-async def check_llm_status(db: Session = Depends(get_db), _admin: bool = Depends(verify_admin)):
-    config_entry = db.query(Config).filter(Config.key == 'LLM_API_KEY').first()
-    llm_key = config_entry.value if config_entry else ""
+async def check_llm_status(db: AsyncSession = Depends(get_async_db), _admin: bool = Depends(verify_admin)):
+    settings = await get_config_snapshot_async(db)
+    llm_key = settings.llm_api_key
     if not llm_key:
         return {"status": "error", "message": "API Key not configured"}
 
-    base_url_entry = db.query(Config).filter(Config.key == 'LLM_BASE_URL').first()
-    base_url = base_url_entry.value if base_url_entry else "https://apis.iflow.cn/v1"
+    base_url = settings.llm_base_url
         
     # Simple verification by listing models or making a very small request.
     # iFlow / OpenAI compatible:
     headers = {"Authorization": f"Bearer {llm_key}"}
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(f"{base_url}/models", headers=headers)
-            if resp.status_code == 200:
-                return {"status": "ok", "message": "Connected successfully"}
-            else:
-                return {"status": "error", "message": f"API Error: {resp.status_code}"}
+        client = http_clients.get("llm")
+        resp = await client.get(f"{base_url}/models", headers=headers, timeout=5.0)
+        if resp.status_code == 200:
+            return {"status": "ok", "message": "Connected successfully"}
+        else:
+            return {"status": "error", "message": f"API Error: {resp.status_code}"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
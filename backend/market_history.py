@@ -0,0 +1,273 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal, upsert
+from models import PriceObservation, PriceRollup
+from price_stats import price_stats
+
+QUEUE_SIZE = int(os.getenv("MARKET_HISTORY_QUEUE_SIZE", "1000"))
+BATCH_SIZE = int(os.getenv("MARKET_HISTORY_BATCH_SIZE", "50")) # Snapshots per write
+BATCH_INTERVAL = float(os.getenv("MARKET_HISTORY_BATCH_INTERVAL", "10"))
+# The same series is recorded at most once per interval, so popular items
+# polled every few seconds don't flood the table with identical listings
+MIN_INTERVAL = float(os.getenv("MARKET_HISTORY_MIN_INTERVAL", "300"))
+# Raw observations older than this are pruned; rollups are kept
+RAW_RETENTION_DAYS = int(os.getenv("MARKET_HISTORY_RETENTION_DAYS", "35"))
+PRUNE_INTERVAL = float(os.getenv("MARKET_HISTORY_PRUNE_INTERVAL", "3600"))
+
+PERIODS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# (item_name, mutation, ms_bucket)
+SeriesKey = Tuple[str, str, str]
+
+def bucket_start(ts: datetime, period: str) -> datetime:
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if period == "day" else ts
+
+def series_key(item_name: str, mutation: Optional[str], ms_bucket: Optional[str]) -> SeriesKey:
+    """Canonical names in, stored key out: mutation "none" and bucket "any" when unset."""
+    mutation = (mutation or "none").lower()
+    ms_bucket = (ms_bucket or "any").lower()
+    return item_name, mutation, "any" if ms_bucket in ("0", "none") else ms_bucket
+
+class MarketHistory:
+    """
+    Append-only price history. Crawl results are queued as snapshots and
+    written in batches: raw offers go to price_observations and are committed
+    first, then the hourly and daily rollups they touch are recomputed from
+    the raw rows (a median can't be merged incrementally) and upserted. If
+    the rollup write fails, those buckets are retried with the next batch;
+    the observations stay. /market/history only ever reads the rollups.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._batch: List[dict] = []
+        # series -> monotonic time it was last accepted
+        self._last_seen: Dict[SeriesKey, float] = {}
+        # (series, period, bucket_start) whose rollup write failed
+        self._stale_rollups: set = set()
+        self.recorded = 0
+        self.throttled = 0
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+        self.rollup_errors = 0
+
+    def record(self, key: SeriesKey, items: List[dict], currency: Optional[str]):
+        """Queues one crawl result. Only offers in the result's main currency are kept."""
+        offers = [
+            (item["price_val"], bool(item.get("outlier")))
+            for item in items
+            if item.get("price_val", 0) > 0 and item.get("currency") == currency
+        ]
+        if self._queue is None or not offers:
+            return
+        now = time.monotonic()
+        if now - self._last_seen.get(key, float("-inf")) < MIN_INTERVAL:
+            self.throttled += 1
+            return
+        snapshot = {"key": key, "observed_at": datetime.utcnow(), "currency": currency, "offers": offers}
+        try:
+            self._queue.put_nowait(snapshot)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._last_seen[key] = now
+        self.recorded += 1
+
+    def _rollup(self, db, key: SeriesKey, period: str, start: datetime):
+        item_name, mutation, ms_bucket = key
+        rows = db.execute(
+            select(PriceObservation.price, PriceObservation.currency)
+            .where(
+                PriceObservation.item_name == item_name,
+                PriceObservation.mutation == mutation,
+                PriceObservation.ms_bucket == ms_bucket,
+                PriceObservation.observed_at >= start,
+                PriceObservation.observed_at < start + PERIODS[period],
+                PriceObservation.outlier.is_(False)
+            )
+        ).all()
+        if not rows:
+            return
+        # A series normally has one currency; if it changed, summarize the dominant one
+        currency = Counter(row.currency for row in rows).most_common(1)[0][0]
+        values = [row.price for row in rows if row.currency == currency]
+        stats = price_stats(values, currency)
+        if stats is None:
+            return
+        fields = {
+            "currency": currency,
+            "count": stats["count"],
+            "min": min(values),
+            "p25": stats["p25"],
+            "median": stats["median"],
+            "p75": stats["p75"],
+            "max": max(values),
+            "mean": stats["mean"]
+        }
+        # Atomic upsert. Another worker may be rebuilding the same bucket from
+        # an older view of the raw rows; observations only ever get added to
+        # a bucket, so the rebuild that counted more rows wins.
+        db.execute(upsert(
+            db.get_bind().dialect.name, PriceRollup,
+            {"item_name": item_name, "mutation": mutation, "ms_bucket": ms_bucket, "period": period, "bucket_start": start, **fields},
+            ["item_name", "mutation", "ms_bucket", "period", "bucket_start"],
+            lambda excluded: {name: getattr(excluded, name) for name in fields},
+            where=lambda excluded: excluded.count >= PriceRollup.count
+        ))
+
+    def write_batch(self, snapshots: List[dict]):
+        rows = []
+        touched = set()
+        for snapshot in snapshots:
+            item_name, mutation, ms_bucket = snapshot["key"]
+            for price, outlier in snapshot["offers"]:
+                rows.append({
+                    "item_name": item_name,
+                    "mutation": mutation,
+                    "ms_bucket": ms_bucket,
+                    "observed_at": snapshot["observed_at"],
+                    "price": price,
+                    "currency": snapshot["currency"],
+                    "outlier": outlier
+                })
+            for period in PERIODS:
+                touched.add((snapshot["key"], period, bucket_start(snapshot["observed_at"], period)))
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(PriceObservation), rows)
+            db.commit()
+            self.written += len(rows)
+        except Exception as e:
+            db.rollback()
+            db.close()
+            self.dropped += len(snapshots)
+            print(f"Error writing market history: {e}")
+            return
+
+        touched |= self._stale_rollups
+        try:
+            for key, period, start in touched:
+                self._rollup(db, key, period, start)
+            db.commit()
+            self._stale_rollups = set()
+        except Exception as e:
+            db.rollback()
+            # Rebuilt from the raw rows with the next batch
+            self._stale_rollups = touched
+            self.rollup_errors += 1
+            print(f"Error writing market history rollups: {e}")
+        finally:
+            db.close()
+
+    def prune(self):
+        cutoff = datetime.utcnow() - timedelta(days=RAW_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            result = db.execute(delete(PriceObservation).where(PriceObservation.observed_at < cutoff))
+            db.commit()
+            self.pruned += result.rowcount or 0
+        except Exception as e:
+            db.rollback()
+            print(f"Error pruning market history: {e}")
+        finally:
+            db.close()
+        # Forget throttle entries that have expired anyway
+        horizon = time.monotonic() - MIN_INTERVAL
+        self._last_seen = {key: seen for key, seen in self._last_seen.items() if seen > horizon}
+
+    async def _drain(self):
+        """Waits for one snapshot, then collects more until the batch is full or the interval ends."""
+        self._batch.append(await self._queue.get())
+        deadline = asyncio.get_running_loop().time() + BATCH_INTERVAL
+        while len(self._batch) < BATCH_SIZE:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _writer(self):
+        while True:
+            await self._drain()
+            snapshots, self._batch = self._batch, []
+            await asyncio.to_thread(self.write_batch, snapshots)
+
+    async def _pruner(self):
+        while True:
+            await asyncio.to_thread(self.prune)
+            await asyncio.sleep(PRUNE_INTERVAL)
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._tasks = [asyncio.ensure_future(self._writer()), asyncio.ensure_future(self._pruner())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        remaining, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        self._queue = None
+        if remaining:
+            await asyncio.to_thread(self.write_batch, remaining)
+
+    async def series(self, db: AsyncSession, key: SeriesKey, period: str, since: datetime) -> List[dict]:
+        """Rollup points for one series from `since` on, oldest first."""
+        item_name, mutation, ms_bucket = key
+        rows = (await db.execute(
+            select(PriceRollup)
+            .where(
+                PriceRollup.item_name == item_name,
+                PriceRollup.mutation == mutation,
+                PriceRollup.ms_bucket == ms_bucket,
+                PriceRollup.period == period,
+                PriceRollup.bucket_start >= bucket_start(since, period)
+            )
+            .order_by(PriceRollup.bucket_start)
+        )).scalars().all()
+        return [
+            {
+                "bucket_start": row.bucket_start,
+                "currency": row.currency,
+                "count": row.count,
+                "min": row.min,
+                "p25": row.p25,
+                "median": row.median,
+                "p75": row.p75,
+                "max": row.max,
+                "mean": row.mean
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "recorded": self.recorded,
+            "throttled": self.throttled,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+            "rollup_errors": self.rollup_errors,
+            "stale_rollups": len(self._stale_rollups)
+        }
+
+market_history = MarketHistory()
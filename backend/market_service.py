@@ -1,8 +1,21 @@
-import httpx
-import re
-from typing import List, Dict, Any, Optional
+import os
+from typing import List, Dict, Any, Optional, Tuple
+from single_flight import SingleFlight
+from http_clients import http_clients
+from item_index import item_index
+from market_history import market_history, series_key
+from ms_rates import filter_offers_by_rate, parse_rate, to_bucket_slug
+from price_stats import parse_price, summarize_offers
 
 CRAWLER_URL = "http://localhost:6674/search"
+# Don't crawl for item names that match nothing in the dictionary
+MARKET_SKIP_UNKNOWN_ITEMS = os.getenv("MARKET_SKIP_UNKNOWN_ITEMS", "1").lower() not in ("0", "false", "no", "off")
+# For an exact rate like "4.4B/s", keep offers whose title rate is within this
+# fraction of it (the bucket alone spans e.g. 1B/s to infinity)
+MARKET_RATE_TOLERANCE = float(os.getenv("MARKET_RATE_TOLERANCE", "0.5"))
+
+# Users analyzing the same item at once share a single crawler request
+market_flights = SingleFlight()
 
 async def fetch_market_prices(filters: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -14,48 +27,108 @@ async def fetch_market_prices(filters: Dict[str, Any]) -> Dict[str, Any]:
 
     # Clean out None or empty string values from filters before passing
     clean_filters = {k: v for k, v in filters.items() if v}
+    target_rate = parse_rate(clean_filters.get("ms_rate"))
+    clean_filters, resolved = resolve_filters(clean_filters)
+    if resolved is None and clean_filters.get("item_name") and MARKET_SKIP_UNKNOWN_ITEMS and item_index().entries:
+        return {"items": [], "average": 0, "error": f"Unknown item: {clean_filters['item_name']}", "resolved": None}
+
+    key = tuple(sorted((k, str(v).strip().lower()) for k, v in clean_filters.items()))
+    result = await market_flights.do(key, lambda: _fetch_from_crawler(clean_filters))
+    series = history_key(clean_filters, resolved)
+    if series is not None and result.get("stats") and not result.get("error"):
+        # Whole-bucket result, before the exact-rate filter below
+        market_history.record(series, result["items"], result["stats"]["currency"])
+    result = {**result, "resolved": resolved}
+    if target_rate is not None and MARKET_RATE_TOLERANCE > 0:
+        result = _filter_by_rate(result, target_rate)
+    return result
+
+def _filter_by_rate(result: Dict[str, Any], target_rate: float) -> Dict[str, Any]:
+    items = result["items"]
+    kept = filter_offers_by_rate(items, target_rate * (1 - MARKET_RATE_TOLERANCE), target_rate * (1 + MARKET_RATE_TOLERANCE))
+    if not kept:
+        # Nothing close enough: fall back to the whole bucket rather than no data
+        return result
+    return {**result, **_summarize(kept), "rate_filtered": len(items) - len(kept)}
+
+def _summarize(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """`average` is the mean after IQR outlier rejection, so one troll listing can't skew it."""
+    items, stats = summarize_offers(items)
+    return {
+        "items": items,
+        "average": stats["inlier_mean"] if stats else 0,
+        "stats": stats
+    }
+
+def history_key(filters: Dict[str, Any], resolved: Optional[dict]):
+    """History series for resolved filters; None if the item, mutation or rate isn't canonical."""
+    if resolved is None:
+        return None
+    mutation = filters.get("mutations")
+    if mutation:
+        mutation = item_index().resolve_mutation(mutation)
+        if mutation is None:
+            return None
+    ms_bucket = filters.get("ms_rate")
+    if ms_bucket:
+        ms_bucket = to_bucket_slug(ms_bucket)
+        if ms_bucket is None:
+            return None
+    return series_key(resolved["item_name"], mutation, ms_bucket)
 
+def resolve_filters(filters: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[dict]]:
+    """
+    Maps free-text item / category / mutation filters onto dictionary
+    names and display rates onto M/s buckets, so the crawler gets a valid
+    filter on the first try. Returns the
+    rewritten filters and the item match plus the canonical `mutation`
+    (None if no item or no match).
+    """
+    index = item_index()
+    filters = dict(filters)
+    if filters.get("ms_rate"):
+        # '4.4B/s' -> '1-plus-bs', the bucket slug the crawler filters on
+        filters["ms_rate"] = to_bucket_slug(filters["ms_rate"]) or filters["ms_rate"]
+    if filters.get("category"):
+        filters["category"] = index.resolve_category(filters["category"]) or filters["category"]
+    mutation = None
+    if filters.get("mutations"):
+        mutation = index.resolve_mutation(filters["mutations"])
+        if mutation:
+            filters["mutations"] = mutation.lower()
+
+    match = index.resolve(filters.get("item_name"), filters.get("category"))
+    if match is None:
+        return filters, None
+    filters["item_name"] = match.name
+    filters["category"] = match.category
+    resolved = match.to_dict()
+    # Which variant was priced; same shape as ItemIndex.resolve_analysis()
+    resolved["mutation"] = mutation
+    return filters, resolved
+
+async def _fetch_from_crawler(clean_filters: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(CRAWLER_URL, params=clean_filters, timeout=15.0)
-            response.raise_for_status()
-            raw_items = response.json()
-            
-            cleaned_items = []
-            total_price = 0
-            valid_count = 0
-
-            for item in raw_items:
-                raw_price = item.get("price", "0")
-                # Remove non-numeric characters except dots (for decimals)
-                # The example shows "¥70,894", so we remove '¥' and ','
-                price_numeric_str = re.sub(r'[^\d.]', '', raw_price)
-                
-                try:
-                    price_val = float(price_numeric_str)
-                except ValueError:
-                    price_val = 0.0
-
-                cleaned_items.append({
-                    "title": item.get("title"),
-                    "price_raw": raw_price,
-                    "price_val": price_val,
-                    "seller": item.get("seller")
-                })
-
-                if price_val > 0:
-                    total_price += price_val
-                    valid_count += 1
-            
-            # Sort by price ascending
-            cleaned_items.sort(key=lambda x: x["price_val"])
-
-            average = total_price / valid_count if valid_count > 0 else 0
-
-            return {
-                "items": cleaned_items,
-                "average": round(average, 2)
-            }
+        client = http_clients.get("crawler")
+        response = await client.get(CRAWLER_URL, params=clean_filters, timeout=15.0)
+        response.raise_for_status()
+        raw_items = response.json()
+        
+        cleaned_items = []
+        for item in raw_items:
+            raw_price = item.get("price", "0")
+            price_val, currency = parse_price(raw_price)
+            cleaned_items.append({
+                "title": item.get("title"),
+                "price_raw": raw_price,
+                "price_val": price_val,
+                "currency": currency,
+                "seller": item.get("seller")
+            })
+
+        # Sort by price ascending
+        cleaned_items.sort(key=lambda x: x["price_val"])
+        return _summarize(cleaned_items)
 
     except Exception as e:
         print(f"Error fetching market prices: {e}")
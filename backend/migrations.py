@@ -0,0 +1,99 @@
+"""
+Versioned schema migrations.
+
+Applied migrations are recorded in `schema_migrations`; each pending one runs
+in its own transaction, in order. The backend applies them on startup, or
+run them by hand:
+
+    python migrations.py           # apply pending migrations
+    python migrations.py status    # list applied / pending versions
+"""
+import os
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from database import engine as default_engine
+from models import APIKey, AdminUser, Config, ConfigVersion, PriceObservation, PriceRollup, UsageLog, UsageRollup
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("applied_at", DateTime)
+)
+
+def _initial_schema(conn):
+    for model in (APIKey, Config, AdminUser, UsageLog):
+        model.__table__.create(conn, checkfirst=True)
+
+def _api_keys_eldorado_email(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("api_keys")}
+    if "eldorado_email" not in columns:
+        conn.execute(text("ALTER TABLE api_keys ADD COLUMN eldorado_email VARCHAR"))
+
+def _seed_llm_api_key(conn):
+    # Only seeds from the environment; the key is managed from the admin panel
+    value = os.getenv("LLM_API_KEY")
+    if not value:
+        return
+    existing = conn.execute(select(Config.id).where(Config.key == "LLM_API_KEY")).first()
+    if existing is None:
+        conn.execute(Config.__table__.insert().values(key="LLM_API_KEY", value=value))
+
+def _usage_logs_timestamp_index(conn):
+    for index in UsageLog.__table__.indexes:
+        if index.name == "ix_usage_logs_timestamp":
+            index.create(conn, checkfirst=True)
+
+def _config_version(conn):
+    ConfigVersion.__table__.create(conn, checkfirst=True)
+
+def _usage_rollups(conn):
+    UsageRollup.__table__.create(conn, checkfirst=True)
+
+def _price_history(conn):
+    PriceObservation.__table__.create(conn, checkfirst=True)
+    PriceRollup.__table__.create(conn, checkfirst=True)
+
+# (version, name, upgrade). Append only; never renumber a released migration.
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "initial_schema", _initial_schema),
+    (2, "api_keys_eldorado_email", _api_keys_eldorado_email),
+    (3, "seed_llm_api_key", _seed_llm_api_key),
+    (4, "usage_logs_timestamp_index", _usage_logs_timestamp_index),
+    (5, "config_version", _config_version),
+    (6, "usage_rollups", _usage_rollups),
+    (7, "price_history", _price_history),
+]
+
+def applied_versions(engine=default_engine) -> set:
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return {row[0] for row in conn.execute(select(schema_migrations.c.version))}
+
+def run_migrations(engine=default_engine) -> List[int]:
+    """Applies every pending migration; returns the versions that ran."""
+    done = applied_versions(engine)
+    ran = []
+    for version, name, upgrade in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        print(f"Applied migration {version:03d} {name}")
+        ran.append(version)
+    return ran
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        done = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:03d} {name:<32} {'applied' if version in done else 'pending'}")
+    else:
+        ran = run_migrations()
+        print(f"Migration complete ({len(ran)} applied)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -23,6 +23,12 @@ class Config(Base):
     key = Column(String, unique=True, index=True)
     value = Column(String)
 
+class ConfigVersion(Base):
+    __tablename__ = "config_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0) # Bumped on every config write, polled by all workers
+
 class AdminUser(Base):
     __tablename__ = "admin_users"
 
@@ -35,6 +41,52 @@ class UsageLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     key_id = Column(Integer, ForeignKey("api_keys.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     ip_address = Column(String)
     action = Column(String)
+
+class UsageRollup(Base):
+    __tablename__ = "usage_rollups"
+    __table_args__ = (UniqueConstraint("key_id", "hour", "action", name="uq_usage_rollup"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    key_id = Column(Integer, ForeignKey("api_keys.id"), index=True)
+    hour = Column(DateTime, index=True) # Start of the UTC hour
+    action = Column(String)
+    count = Column(Integer, default=0)
+
+class PriceObservation(Base):
+    """One offer seen in a crawl. Append-only; pruned after the raw retention window."""
+    __tablename__ = "price_observations"
+    __table_args__ = (Index("ix_price_observations_series", "item_name", "mutation", "ms_bucket", "observed_at"),)
+
+    id = Column(Integer, primary_key=True)
+    item_name = Column(String) # Canonical dictionary name
+    mutation = Column(String) # Canonical mutation, "none" if unmutated
+    ms_bucket = Column(String) # M/s bucket slug, "any" if unfiltered
+    observed_at = Column(DateTime, index=True)
+    price = Column(Float)
+    currency = Column(String, nullable=True)
+    outlier = Column(Boolean, default=False)
+
+class PriceRollup(Base):
+    """Per-hour / per-day price summary of one series, rebuilt from observations on ingest."""
+    __tablename__ = "price_rollups"
+    __table_args__ = (
+        UniqueConstraint("item_name", "mutation", "ms_bucket", "period", "bucket_start", name="uq_price_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    item_name = Column(String)
+    mutation = Column(String)
+    ms_bucket = Column(String)
+    period = Column(String) # hour, day
+    bucket_start = Column(DateTime) # Start of the UTC hour / day
+    currency = Column(String, nullable=True)
+    count = Column(Integer, default=0) # Non-outlier offers
+    min = Column(Float)
+    p25 = Column(Float)
+    median = Column(Float)
+    p75 = Column(Float)
+    max = Column(Float)
+    mean = Column(Float)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from ai_service import analyze_image_stream
+from batch_analyze import analyze_limiter
+from item_index import item_index
+from market_service import fetch_market_prices
+
+# Offers returned with a pipeline result
+PIPELINE_CHEAPEST_K = int(os.getenv("PIPELINE_CHEAPEST_K", "5"))
+
+def market_filters(resolved: dict, mutation: Optional[str] = None, ms_rate: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "item_name": resolved["item_name"],
+        "category": resolved["category"],
+        "mutations": mutation,
+        "ms_rate": ms_rate
+    }
+
+class AnalyzePricePipeline:
+    """
+    Runs the streaming analysis and starts the market lookup as soon as the
+    item is known, so LLM and crawler time overlap instead of adding up.
+
+    Speculation: when `item_name` resolves before `mutation` has arrived, the
+    lookup for the plain (no mutation, no rate) item starts right away. If the
+    model then reports neither, that request is the answer; otherwise the
+    specific lookup is started and the guess is dropped.
+
+    Only the model call holds an analyze_limiter slot; waiting on the
+    crawler afterwards does not block other analyses.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.speculative_used = 0
+        self.speculative_wasted = 0
+
+    async def run(self, contents: bytes, settings, key_id: int) -> dict:
+        self.runs += 1
+        started = time.perf_counter()
+        elapsed_ms = lambda: round((time.perf_counter() - started) * 1000)
+
+        seen: Dict[str, Any] = {}
+        analysis, cache_status = None, None
+        speculative, speculative_filters = None, None
+        market_task, market_started_ms = None, None
+        resolved = None
+
+        def start_market():
+            # Called once the item, mutation and ms_rate are known
+            nonlocal market_task, speculative, market_started_ms
+            filters = market_filters(resolved, resolved.get("mutation"), seen.get("ms_rate"))
+            if speculative is not None and filters == speculative_filters:
+                market_task, speculative = speculative, None
+                self.speculative_used += 1
+            else:
+                market_task = asyncio.ensure_future(fetch_market_prices(filters))
+                market_started_ms = elapsed_ms()
+
+        try:
+            async with analyze_limiter.slot(key_id):
+                async for event, data in analyze_image_stream(contents, settings.llm_api_key, settings.llm_base_url, settings.llm_model, settings.system_prompt):
+                    if event == "cache":
+                        cache_status = data
+                    elif event == "field":
+                        seen[data[0]] = data[1]
+                        if data[0] == "item_name" and "mutation" not in seen and speculative is None and market_task is None:
+                            match = item_index().resolve(data[1])
+                            if match is not None:
+                                speculative_filters = market_filters(match.to_dict())
+                                speculative = asyncio.ensure_future(fetch_market_prices(speculative_filters))
+                                market_started_ms = elapsed_ms()
+                    elif event == "resolved":
+                        resolved = data
+                    elif event == "result":
+                        analysis = data
+                        if resolved is None and "error" not in data:
+                            resolved = data.get("resolved")
+                    # ms_rate directly follows mutation in the stream, so waiting for it costs a few tokens
+                    if resolved is not None and market_task is None and ("ms_rate" in seen or analysis is not None):
+                        start_market()
+        except BaseException:
+            # Client went away or the stream failed: drop pending lookups
+            for task in (speculative, market_task):
+                if task is not None:
+                    task.cancel()
+            raise
+        analysis_ms = elapsed_ms()
+
+        if speculative is not None:
+            # Guess was wrong (or the item never resolved); stop waiting on it
+            speculative.cancel()
+            self.speculative_wasted += 1
+
+        market = None
+        if market_task is not None:
+            market = await market_task
+        items = market.get("items", []) if market else []
+        stats = market.get("stats") if market else None
+        # Only inliers: outlier is None for offers in a currency that couldn't be converted
+        cheapest = [item for item in items if item.get("price_val", 0) > 0 and item.get("outlier") is False][:PIPELINE_CHEAPEST_K]
+        if market is not None:
+            market_error = market.get("error")
+        elif analysis is None:
+            market_error = "Analysis returned no result"
+        elif "error" in analysis:
+            # No lookup because the analysis failed; report why
+            market_error = analysis["error"]
+        else:
+            market_error = "Item not recognised"
+
+        return {
+            "analysis": analysis,
+            "market": {
+                "resolved": market.get("resolved") if market else None,
+                "average": market.get("average", 0) if market else 0,
+                "count": len(items),
+                "stats": stats,
+                "cheapest": cheapest,
+                "error": market_error
+            },
+            "suggested_price": stats["suggested_price"] if stats else None,
+            "timing": {
+                "cache": cache_status,
+                "analysis_ms": analysis_ms,
+                "market_started_ms": market_started_ms,
+                "total_ms": elapsed_ms()
+            }
+        }
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "speculative_used": self.speculative_used,
+            "speculative_wasted": self.speculative_wasted
+        }
+
+analyze_price_pipeline = AnalyzePricePipeline()
@@ -0,0 +1,175 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    # Pure-Python fallback; same results, slower on large result sets
+    NUMPY_AVAILABLE = False
+
+# Undercut applied to the cheapest non-outlier offer for the suggested price
+PRICE_UNDERCUT_PCT = float(os.getenv("PRICE_UNDERCUT_PCT", "1"))
+# Share of offers cut from each end for the trimmed mean
+PRICE_TRIM_FRACTION = float(os.getenv("PRICE_TRIM_FRACTION", "0.1"))
+# Tukey fence multiplier for IQR outlier rejection
+PRICE_IQR_K = float(os.getenv("PRICE_IQR_K", "1.5"))
+PRICE_CHEAPEST_K = int(os.getenv("PRICE_CHEAPEST_K", "5"))
+# USD value of one unit per currency, e.g. {"EUR": 1.08}. Used to convert
+# offers into the most common currency of a result set; offers in a currency
+# without a rate are left out of the statistics.
+PRICE_FX_RATES_USD: Dict[str, float] = {"USD": 1.0, **json.loads(os.getenv("PRICE_FX_RATES_USD", "{}"))}
+
+_SYMBOLS = {"US$": "USD", "$": "USD", "€": "EUR", "£": "GBP", "¥": "CNY", "₩": "KRW", "R$": "BRL"}
+# Currencies written without minor units
+_ZERO_DECIMAL = {"JPY", "KRW"}
+
+PRICE_PATTERN = re.compile(
+    r"(?P<pre>US\$|R\$|[$€£¥₩]|\b[A-Z]{3}\b)?\s*"
+    r"(?P<num>\d[\d,.\s]*\d|\d)"
+    r"\s*(?P<post>[€£¥]|\b[A-Z]{3}\b)?"
+)
+
+def _to_float(number: str, currency: Optional[str]) -> float:
+    number = number.replace(" ", "")
+    if "," in number and "." in number:
+        # Whichever separator comes last is the decimal point
+        if number.rfind(",") > number.rfind("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    elif "," in number:
+        head, _, tail = number.rpartition(",")
+        # "12,50" is a decimal comma; "70,894" / "1,234,567" group thousands
+        number = number.replace(",", "") if len(tail) == 3 else head.replace(",", "") + "." + tail
+    elif number.count(".") > 1 or (currency == "EUR" and len(number.rpartition(".")[2]) == 3):
+        number = number.replace(".", "")
+    return float(number)
+
+def parse_price(raw: Optional[str]) -> Tuple[float, Optional[str]]:
+    """'¥70,894' -> (70894.0, 'CNY'); '1.234,50 €' -> (1234.5, 'EUR'); unparseable -> (0.0, None)."""
+    if not raw:
+        return 0.0, None
+    match = PRICE_PATTERN.search(raw)
+    if not match:
+        return 0.0, None
+    code = match.group("pre") or match.group("post")
+    currency = _SYMBOLS.get(code, code)
+    try:
+        return _to_float(match.group("num"), currency), currency
+    except ValueError:
+        return 0.0, currency
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Linear interpolation, same as numpy's default
+    position = (len(sorted_values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+def _stats_numpy(values: List[float]) -> dict:
+    arr = np.sort(np.asarray(values, dtype=np.float64))
+    p10, q1, median, q3, p90 = np.percentile(arr, [10, 25, 50, 75, 90])
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - PRICE_IQR_K * iqr, q3 + PRICE_IQR_K * iqr
+    inliers = arr[(arr >= low_fence) & (arr <= high_fence)]
+    trim = int(len(arr) * PRICE_TRIM_FRACTION)
+    trimmed = arr[trim:len(arr) - trim] if len(arr) > 2 * trim else arr
+    return {
+        "mean": float(arr.mean()),
+        "median": float(median),
+        "trimmed_mean": float(trimmed.mean()),
+        "inlier_mean": float(inliers.mean()),
+        "p10": float(p10), "p25": float(q1), "p75": float(q3), "p90": float(p90),
+        "iqr": float(iqr),
+        "fences": (float(low_fence), float(high_fence)),
+        "cheapest": inliers[:PRICE_CHEAPEST_K].tolist(),
+        "outliers": int(len(arr) - len(inliers))
+    }
+
+def _stats_python(values: List[float]) -> dict:
+    arr = sorted(values)
+    p10, q1, median, q3, p90 = (_percentile(arr, q) for q in (10, 25, 50, 75, 90))
+    iqr = q3 - q1
+    low_fence, high_fence = q1 - PRICE_IQR_K * iqr, q3 + PRICE_IQR_K * iqr
+    inliers = [v for v in arr if low_fence <= v <= high_fence]
+    trim = int(len(arr) * PRICE_TRIM_FRACTION)
+    trimmed = arr[trim:len(arr) - trim] if len(arr) > 2 * trim else arr
+    return {
+        "mean": sum(arr) / len(arr),
+        "median": median,
+        "trimmed_mean": sum(trimmed) / len(trimmed),
+        "inlier_mean": sum(inliers) / len(inliers),
+        "p10": p10, "p25": q1, "p75": q3, "p90": p90,
+        "iqr": iqr,
+        "fences": (low_fence, high_fence),
+        "cheapest": inliers[:PRICE_CHEAPEST_K],
+        "outliers": len(arr) - len(inliers)
+    }
+
+def _compute(values: List[float]) -> dict:
+    return (_stats_numpy if NUMPY_AVAILABLE else _stats_python)(values)
+
+def _finish(stats: dict, count: int, currency: Optional[str]) -> dict:
+    digits = 0 if currency in _ZERO_DECIMAL else 2
+    suggested = stats["cheapest"][0] * (1 - PRICE_UNDERCUT_PCT / 100) if stats["cheapest"] else None
+    result = {key: round(value, digits) for key, value in stats.items() if isinstance(value, float)}
+    result["fences"] = [round(v, digits) for v in stats["fences"]]
+    result["cheapest"] = [round(v, digits) for v in stats["cheapest"]]
+    result["outliers"] = stats["outliers"]
+    result["count"] = count
+    result["currency"] = currency
+    result["suggested_price"] = round(suggested, digits) if suggested is not None else None
+    return result
+
+def price_stats(values: List[float], currency: Optional[str] = None) -> Optional[dict]:
+    """
+    Robust summary of positive prices: median, trimmed mean, percentiles,
+    Tukey IQR fences with the outlier count, the cheapest K inliers and a
+    suggested undercut price. None if there are no prices.
+    """
+    values = [v for v in values if v > 0]
+    if not values:
+        return None
+    return _finish(_compute(values), len(values), currency)
+
+def summarize_offers(items: List[dict]) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Stats over cleaned offers ({"price_val", "currency"}), in the most common
+    currency. Offers in other currencies are converted with
+    PRICE_FX_RATES_USD where possible, otherwise skipped. Returns copies of
+    the offers with an `outlier` flag, plus the stats (None if no prices);
+    offers left out because their currency couldn't be converted get
+    `outlier=None`. `items` itself is left untouched, since it may be shared
+    between callers.
+    """
+    currencies = Counter(item.get("currency") for item in items if item.get("price_val", 0) > 0)
+    if not currencies:
+        return [{**item, "outlier": False} for item in items], None
+    currency = currencies.most_common(1)[0][0]
+    target_rate = PRICE_FX_RATES_USD.get(currency)
+
+    converted = []
+    for item in items:
+        value = item.get("price_val", 0)
+        if value > 0 and item.get("currency") != currency:
+            source_rate = PRICE_FX_RATES_USD.get(item.get("currency"))
+            value = value * source_rate / target_rate if source_rate and target_rate else 0
+        converted.append(value)
+
+    values = [v for v in converted if v > 0]
+    stats = _compute(values)
+    low, high = stats["fences"]
+    flagged = []
+    for item, value in zip(items, converted):
+        if value > 0:
+            outlier = not (low <= value <= high)
+        else:
+            # Unconverted offers aren't comparable with the rest, so neither in nor out
+            outlier = None if item.get("price_val", 0) > 0 else False
+        flagged.append({**item, "outlier": outlier})
+    return flagged, _finish(stats, len(values), currency)
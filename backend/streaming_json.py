@@ -0,0 +1,66 @@
+import json
+from typing import List, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+class IncrementalJsonFields:
+    """
+    Parses a top-level JSON object that arrives in chunks and reports each
+    field once its value is complete. A value only counts as complete once
+    the following ',' or '}' has arrived, so `12` is never reported when the
+    model is still writing `125`. Markdown code fences around the object are
+    skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.fields = {}
+
+    def _skip_ws(self):
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+            self.pos += 1
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        self.buffer += chunk
+        completed = []
+        if not self.started:
+            brace = self.buffer.find("{", self.pos)
+            if brace < 0:
+                return completed
+            self.pos = brace + 1
+            self.started = True
+
+        while not self.finished:
+            self._skip_ws()
+            if self.pos >= len(self.buffer):
+                break
+            if self.buffer[self.pos] in ",":
+                self.pos += 1
+                continue
+            if self.buffer[self.pos] == "}":
+                self.pos += 1
+                self.finished = True
+                break
+            try:
+                key, key_end = _decoder.raw_decode(self.buffer, self.pos)
+                colon = self.buffer.index(":", key_end)
+                value_start = colon + 1
+                while value_start < len(self.buffer) and self.buffer[value_start] in _WHITESPACE:
+                    value_start += 1
+                value, value_end = _decoder.raw_decode(self.buffer, value_start)
+            except ValueError:
+                break  # key or value still incomplete
+            # Wait for the delimiter so numbers / literals are not cut short
+            rest = value_end
+            while rest < len(self.buffer) and self.buffer[rest] in _WHITESPACE:
+                rest += 1
+            if rest >= len(self.buffer) or self.buffer[rest] not in ",}":
+                break
+            self.fields[key] = value
+            completed.append((key, value))
+            self.pos = rest
+        return completed
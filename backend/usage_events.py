@@ -0,0 +1,138 @@
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import insert, delete
+
+from database import SessionLocal, upsert
+from models import UsageLog, UsageRollup
+
+# Bounded in-memory queue; events are dropped (and counted) rather than
+# slowing requests down when the writer falls behind.
+QUEUE_SIZE = int(os.getenv("USAGE_EVENT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("USAGE_EVENT_BATCH_SIZE", "500"))
+BATCH_INTERVAL = float(os.getenv("USAGE_EVENT_BATCH_INTERVAL", "5"))
+# Raw usage_logs rows older than this are pruned; hourly rollups are kept.
+RAW_RETENTION_DAYS = int(os.getenv("USAGE_LOG_RETENTION_DAYS", "14"))
+PRUNE_INTERVAL = float(os.getenv("USAGE_LOG_PRUNE_INTERVAL", "3600"))
+
+def _hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+class UsageEventPipeline:
+    """
+    Collects usage events from request handlers and writes them in batches:
+    raw rows go to usage_logs and per-key hourly counts are merged into
+    usage_rollups in the same transaction, with an INSERT ... ON CONFLICT
+    upsert so several workers can flush the same hour.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Events taken off the queue but not yet handed to a write
+        self._batch: List[dict] = []
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+
+    def emit(self, key_id: int, ip_address: Optional[str], action: str):
+        if self._queue is None:
+            self.dropped += 1
+            return
+        event = {"key_id": key_id, "timestamp": datetime.utcnow(), "ip_address": ip_address, "action": action}
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def write_batch(self, events: List[dict]):
+        rollups = Counter((e["key_id"], _hour(e["timestamp"]), e["action"]) for e in events)
+        db = SessionLocal()
+        try:
+            db.execute(insert(UsageLog), events)
+            dialect = db.get_bind().dialect.name
+            for (key_id, hour, action), count in rollups.items():
+                # Atomic upsert: another worker may be adding to the same hour
+                db.execute(upsert(
+                    dialect, UsageRollup,
+                    {"key_id": key_id, "hour": hour, "action": action, "count": count},
+                    ["key_id", "hour", "action"],
+                    lambda excluded: {"count": UsageRollup.count + excluded.count}
+                ))
+            db.commit()
+            self.written += len(events)
+        except Exception as e:
+            db.rollback()
+            self.dropped += len(events)
+            print(f"Error writing usage events: {e}")
+        finally:
+            db.close()
+
+    def prune(self):
+        cutoff = datetime.utcnow() - timedelta(days=RAW_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            result = db.execute(delete(UsageLog).where(UsageLog.timestamp < cutoff))
+            db.commit()
+            self.pruned += result.rowcount or 0
+        except Exception as e:
+            db.rollback()
+            print(f"Error pruning usage logs: {e}")
+        finally:
+            db.close()
+
+    async def _drain(self):
+        """Waits for one event, then collects more until the batch is full or the interval ends."""
+        self._batch.append(await self._queue.get())
+        deadline = asyncio.get_running_loop().time() + BATCH_INTERVAL
+        while len(self._batch) < BATCH_SIZE:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _writer(self):
+        while True:
+            await self._drain()
+            events, self._batch = self._batch, []
+            await asyncio.to_thread(self.write_batch, events)
+
+    async def _pruner(self):
+        while True:
+            await asyncio.to_thread(self.prune)
+            await asyncio.sleep(PRUNE_INTERVAL)
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._tasks = [asyncio.ensure_future(self._writer()), asyncio.ensure_future(self._pruner())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Write whatever is still queued
+        remaining, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        self._queue = None
+        if remaining:
+            await asyncio.to_thread(self.write_batch, remaining)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pruned": self.pruned
+        }
+
+usage_events = UsageEventPipeline()
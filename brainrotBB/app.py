@@ -1,38 +1,102 @@
-from fastapi import FastAPI, HTTPException, Query
-from playwright_scraper import fetch_search_results
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Response
+from backends import create_backend
+from browser_pool import BrowserPool, PoolSaturated
+from ms_rates import to_bucket_slug
+from offers_api import OffersApiClient, UnknownFilterError
+from prewarm import PopularityTracker, PrewarmScheduler, seed_from_dictionary
+from readiness import readiness_stats
+from resource_blocking import blocking_stats
+from result_cache import SearchCache, canonical_key
+from single_flight import SingleFlight
+import config
 from typing import List, Dict
 import logging
 
-# Initialize FastAPI app
-app = FastAPI(title="Eldorado Scraper API", version="1.0.0")
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("api")
 
+# Warm browsers shared by every request of this worker process; only
+# started when the configured backend can use them.
+browser_pool = BrowserPool()
+api_client = OffersApiClient()
+use_browser = config.SCRAPER_BACKEND == "browser" or config.BROWSER_FALLBACK
+offer_backend = create_backend(config.SCRAPER_BACKEND, api_client, browser_pool if use_browser else None)
+search_cache = SearchCache()
+# Identical searches arriving together share one scrape
+search_flights = SingleFlight()
+# Learns hot filter combinations from /search traffic and keeps them cached
+popularity = PopularityTracker()
+prewarmer = PrewarmScheduler(offer_backend, search_cache, search_flights, popularity)
+if config.PREWARM_SEED_DICTIONARY:
+    seed_from_dictionary(popularity)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay the Chromium cold-start once per worker, not once per query
+    await api_client.start()
+    if use_browser:
+        await browser_pool.start()
+    prewarmer.start()
+    yield
+    await prewarmer.stop()
+    if use_browser:
+        await browser_pool.close()
+    await api_client.close()
+
+# Initialize FastAPI app
+app = FastAPI(title="Eldorado Scraper API", version="1.0.0", lifespan=lifespan)
+
 @app.get("/")
 def read_root():
-    return {"status": "ok", "message": "Eldorado Scraper API is running"}
+    return {
+        "status": "ok",
+        "message": "Eldorado Scraper API is running",
+        "backend": offer_backend.name,
+        "rate_filtered": offer_backend.dropped,
+        "pool": browser_pool.stats() if use_browser else None,
+        "readiness": readiness_stats.snapshot(),
+        "blocking": blocking_stats.snapshot(),
+        "cache": search_cache.stats(),
+        "single_flight": search_flights.stats(),
+        "prewarm": prewarmer.stats()
+    }
 
 @app.get("/search", response_model=List[Dict[str, str]])
-def search_items(
-    ms_rate: str = Query(None, description="M/s Rate (e.g. 1-plus-bs)"),
+async def search_items(
+    response: Response,
+    ms_rate: str = Query(None, description="M/s Rate bucket (e.g. 1-plus-bs) or a rate (e.g. 4.4B/s)"),
     mutations: str = Query(None, description="Mutations (e.g. lava)"),
     category: str = Query(None, description="Category (e.g. OG, Secret)"),
-    item_name: str = Query(None, description="Specific item name (e.g. Skibidi Toilet)")
+    item_name: str = Query(None, description="Specific item name (e.g. Skibidi Toilet)"),
+    max_pages: int = Query(1, ge=1, le=config.MAX_PAGES_LIMIT, description="Pages to fetch (fetched concurrently)"),
+    page_size: int = Query(24, ge=1, le=config.MAX_PAGE_SIZE, description="Offers per page")
 ):
     """
     Search for items on Eldorado.gg using filters.
     """
+    ms_bucket = to_bucket_slug(ms_rate)
+    if ms_rate and ms_bucket is None:
+        # Neither a bucket slug nor a readable rate: malformed input
+        raise HTTPException(status_code=400, detail=f"Invalid ms_rate '{ms_rate}', expected a bucket like 1-plus-bs or a rate like 4.4B/s")
     filters = {
-        "ms_rate": ms_rate,
+        # '4.4B/s' -> '1-plus-bs'
+        "ms_rate": ms_bucket,
         "mutations": mutations,
         "category": category,
         "item_name": item_name
     }
-    logger.info(f"Received search request for filters: {filters}")
+    logger.info(f"Received search request for filters: {filters} (pages={max_pages}, size={page_size})")
     try:
-        results = fetch_search_results(filters)
+        key = canonical_key(filters, max_pages, page_size)
+        results, age, cache_status = await search_cache.get_or_fetch(
+            key, lambda: search_flights.do(key, lambda: offer_backend.search(filters, max_pages, page_size))
+        )
+        # Only searches that succeed count towards pre-warming
+        popularity.record(key, filters, max_pages, page_size)
+        response.headers["Age"] = str(int(age))
+        response.headers["X-Cache"] = cache_status
         if not results:
              # Depending on requirements, empty list might be 200 OK or 404
              # Returning empty list is standard for search
@@ -41,6 +105,13 @@ def search_items(
         
         logger.info(f"Returning {len(results)} results.")
         return results
+    except PoolSaturated as e:
+        logger.warning(f"Rejecting search, scraper is saturated: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except UnknownFilterError as e:
+        # Not in the dictionary and no browser fallback to try it; 5xx is kept for upstream failures
+        logger.info(f"Rejecting search: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Internal server error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,89 @@
+import logging
+from typing import Dict, List, Optional
+
+from browser_pool import BrowserPool, PoolSaturated
+from ms_rates import bucket_range, filter_offers_by_rate
+from offers_api import OffersApiClient
+from pagination import fetch_pages
+from playwright_scraper import fetch_search_results
+
+logger = logging.getLogger(__name__)
+
+# A backend is anything with a `name` and
+# `async search(filters, max_pages, page_size) -> list of {"title", "price", "seller"}`.
+# The API client is the fast path; the browser renders the page and is kept
+# as a fallback.
+
+class BrowserBackend:
+    name = "browser"
+
+    def __init__(self, pool: BrowserPool):
+        self.pool = pool
+
+    async def _page(self, filters: dict, page_index: int, page_size: int):
+        rows = await fetch_search_results(filters, self.pool, page_index, page_size)
+        return rows, len(rows)
+
+    async def search(self, filters: dict, max_pages: int = 1, page_size: int = 24) -> List[Dict[str, str]]:
+        # Each extra page takes its own pool slot, so pages load in parallel
+        return await fetch_pages(lambda i: self._page(filters, i, page_size), max_pages, page_size)
+
+class FallbackBackend:
+    """
+    Tries `primary`; on any failure other than saturation, asks `fallback`.
+    That includes filter values missing from the local dictionary, which the
+    page scrape can still handle (e.g. newly released items).
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+        self.fallback_count = 0
+
+    async def search(self, filters: dict, max_pages: int = 1, page_size: int = 24) -> List[Dict[str, str]]:
+        try:
+            return await self.primary.search(filters, max_pages, page_size)
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            self.fallback_count += 1
+            logger.warning(f"{self.primary.name} backend failed ({e}), falling back to {self.fallback.name}.")
+            return await self.fallback.search(filters, max_pages, page_size)
+
+class RateFilteredBackend:
+    """
+    Drops offers whose title states an M/s rate outside the requested
+    bucket. Sellers often list an item under the wrong bucket, which skews
+    prices for that bucket.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.dropped = 0
+
+    async def search(self, filters: dict, max_pages: int = 1, page_size: int = 24) -> List[Dict[str, str]]:
+        results = await self.inner.search(filters, max_pages, page_size)
+        rate_range = bucket_range((filters.get("ms_rate") or "").lower())
+        if rate_range is None:
+            return results
+        kept = filter_offers_by_rate(results, *rate_range)
+        self.dropped += len(results) - len(kept)
+        return kept
+
+def create_backend(name: str, api_client: OffersApiClient, pool: Optional[BrowserPool]):
+    """
+    'api'     -> JSON client, browser fallback if a pool is given
+    'browser' -> Playwright only
+    Either way results are post-filtered by the rate in offer titles.
+    """
+    if name == "browser":
+        if pool is None:
+            raise ValueError("The browser backend needs a browser pool")
+        return RateFilteredBackend(BrowserBackend(pool))
+    if name == "api":
+        if pool is None:
+            return RateFilteredBackend(api_client)
+        return RateFilteredBackend(FallbackBackend(api_client, BrowserBackend(pool)))
+    raise ValueError(f"Unknown scraper backend '{name}'")
@@ -0,0 +1,90 @@
+"""
+Benchmarks the offer parsers over the saved search pages in fixtures/html.
+
+    python bench_parsers.py               # every installed HTML parser
+    python bench_parsers.py --browser     # also time in-page extraction vs page.content()
+    python bench_parsers.py -n 50 html.parser selectolax
+
+Reports offers/second, ms per page and peak Python memory per parse
+(tracemalloc), and checks every parser returns the same rows as html.parser.
+"""
+import argparse
+import asyncio
+import glob
+import os
+import time
+import tracemalloc
+
+from offer_parsers import PARSERS, extract_offers_in_page, parse_html_parser, parser_available
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+def bench_parser(parse, html_content: str, iterations: int):
+    parse(html_content)  # warm-up (imports, XPath compilation)
+    tracemalloc.start()
+    rows = parse(html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(html_content)
+    elapsed = time.perf_counter() - started
+    return rows, elapsed / iterations, peak
+
+def print_row(fixture: str, name: str, offers: int, per_page_s: float, peak: int, note: str = ""):
+    offers_per_s = offers / per_page_s if per_page_s and offers else 0
+    print(f"{fixture:<26} {name:<14} {offers:>6} {per_page_s * 1000:>9.2f} {offers_per_s:>12.0f} {peak / 1024:>10.0f}  {note}")
+
+async def bench_browser(fixtures: dict, iterations: int):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for fixture, html_content in fixtures.items():
+            await page.set_content(html_content)
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                rows = await extract_offers_in_page(page)
+            print_row(fixture, "evaluate", len(rows), (time.perf_counter() - started) / iterations, 0, "in-page, no Python tree")
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                rows = parse_html_parser(await page.content())
+            print_row(fixture, "content+bs4", len(rows), (time.perf_counter() - started) / iterations, 0, "page.content() + html.parser")
+        await browser.close()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("parsers", nargs="*", help="parser names (default: all installed)")
+    arg_parser.add_argument("-n", "--iterations", type=int, default=20)
+    arg_parser.add_argument("--browser", action="store_true", help="also benchmark in-page extraction with Playwright")
+    args = arg_parser.parse_args()
+
+    fixtures = load_fixtures()
+    names = args.parsers or list(PARSERS)
+
+    print(f"{'fixture':<26} {'parser':<14} {'offers':>6} {'ms/page':>9} {'offers/s':>12} {'peak KiB':>10}")
+    for fixture, html_content in fixtures.items():
+        expected = parse_html_parser(html_content)
+        for name in names:
+            if not parser_available(name):
+                print(f"{fixture:<26} {name:<14} {'skipped (package not installed)':>40}")
+                continue
+            rows, per_page_s, peak = bench_parser(PARSERS[name], html_content, args.iterations)
+            print_row(fixture, name, len(rows), per_page_s, peak, "" if rows == expected else "MISMATCH vs html.parser")
+
+    if args.browser:
+        asyncio.run(bench_browser(fixtures, args.iterations))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from playwright.async_api import async_playwright
+
+import config
+from resource_blocking import install_blocker
+
+logger = logging.getLogger(__name__)
+
+class PoolSaturated(Exception):
+    """Raised when the wait queue is full or a page did not free up in time."""
+
+class _BrowserHandle:
+    """One Chromium process shared by several page slots."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.lock = asyncio.Lock()
+
+class _PageSlot:
+    """A context + page pinned to a browser, reused across scrapes."""
+
+    def __init__(self, index: int, handle: _BrowserHandle):
+        self.index = index
+        self.handle = handle
+        self.context = None
+        self.page = None
+        self.uses = 0
+
+class BrowserPool:
+    """
+    Warm Chromium pool for the async scraper.
+    `size` browsers are launched once in start() and `max_pages` page slots are
+    spread over them; the number of slots bounds concurrent page loads. Callers
+    beyond that wait in a queue of at most `max_queue` entries, after which
+    acquire() fails fast with PoolSaturated. Slots are recycled after
+    `max_uses` scrapes or on any error.
+    """
+
+    def __init__(
+        self,
+        size: int = config.BROWSER_POOL_SIZE,
+        max_pages: int = config.MAX_CONCURRENT_PAGES,
+        max_queue: int = config.MAX_QUEUE_DEPTH,
+        queue_timeout: float = config.QUEUE_WAIT_TIMEOUT_S,
+        max_uses: int = config.CONTEXT_MAX_USES,
+        headless: bool = config.HEADLESS,
+        user_agent: str = config.USER_AGENT
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_uses = max_uses
+        self.headless = headless
+        self.user_agent = user_agent
+
+        self._playwright = None
+        self._handles: List[_BrowserHandle] = []
+        self._slots: List[_PageSlot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self._started = False
+
+        self.recycle_count = 0
+        self.rejected_count = 0
+
+    async def start(self):
+        if self._started:
+            return
+        self._playwright = await async_playwright().start()
+        self._handles = [_BrowserHandle(i) for i in range(self.size)]
+        await asyncio.gather(*(self._launch(h) for h in self._handles))
+
+        self._idle = asyncio.Queue()
+        self._slots = [_PageSlot(i, self._handles[i % self.size]) for i in range(self.max_pages)]
+        for slot in self._slots:
+            await self._prepare(slot)
+            self._idle.put_nowait(slot)
+
+        self._started = True
+        logger.info(f"Browser pool started: {self.size} browser(s), {self.max_pages} page slot(s).")
+
+    async def _launch(self, handle: _BrowserHandle):
+        handle.browser = await self._playwright.chromium.launch(headless=self.headless)
+        logger.info(f"Chromium #{handle.index} launched.")
+
+    async def _prepare(self, slot: _PageSlot):
+        handle = slot.handle
+        async with handle.lock:
+            if handle.browser is None or not handle.browser.is_connected():
+                logger.warning(f"Chromium #{handle.index} is gone, relaunching.")
+                await self._launch(handle)
+        if slot.context is None:
+            slot.context = await handle.browser.new_context(user_agent=self.user_agent)
+            slot.page = None
+        if slot.page is None or slot.page.is_closed():
+            slot.page = await slot.context.new_page()
+            await install_blocker(slot.page)
+
+    async def _recycle(self, slot: _PageSlot):
+        self.recycle_count += 1
+        slot.uses = 0
+        try:
+            if slot.context is not None:
+                await slot.context.close()
+        except Exception as e:
+            logger.warning(f"Error closing context of slot {slot.index}: {e}")
+        slot.context = None
+        slot.page = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Yields a ready page; the slot goes back to the pool on exit."""
+        if not self._started:
+            raise RuntimeError("Browser pool is not running")
+        if self._idle.empty() and self._waiting >= self.max_queue:
+            self.rejected_count += 1
+            raise PoolSaturated(f"Scrape queue is full ({self._waiting} waiting)")
+
+        self._waiting += 1
+        try:
+            slot = await asyncio.wait_for(self._idle.get(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_count += 1
+            raise PoolSaturated(f"No free page after {self.queue_timeout}s")
+        finally:
+            self._waiting -= 1
+
+        try:
+            await self._prepare(slot)
+            yield slot.page
+        except BaseException:
+            await self._recycle(slot)
+            raise
+        else:
+            slot.uses += 1
+            if self.max_uses and slot.uses >= self.max_uses:
+                logger.info(f"Slot {slot.index} reached {slot.uses} uses, recycling.")
+                await self._recycle(slot)
+        finally:
+            self._idle.put_nowait(slot)
+
+    def stats(self) -> dict:
+        return {
+            "browsers": self.size,
+            "pages": self.max_pages,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "waiting": self._waiting,
+            "max_queue": self.max_queue,
+            "recycled": self.recycle_count,
+            "rejected": self.rejected_count
+        }
+
+    async def close(self):
+        for slot in self._slots:
+            try:
+                if slot.context is not None:
+                    await slot.context.close()
+            except Exception:
+                pass
+        for handle in self._handles:
+            try:
+                if handle.browser is not None:
+                    await handle.browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._slots = []
+        self._handles = []
+        self._playwright = None
+        self._started = False
+        logger.info("Browser pool closed.")
@@ -0,0 +1,106 @@
+import os
+
+# Scraper service settings. Every value can be overridden with an environment
+# variable so the same code runs on dev laptops and on the scraper boxes.
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def _env_list(name: str, default: str) -> list:
+    value = os.getenv(name, default)
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+USER_AGENT = os.getenv(
+    "SCRAPER_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+HEADLESS = _env_bool("SCRAPER_HEADLESS", True)
+
+# Fetch backend: "api" queries the flexibleOffers JSON endpoint directly,
+# "browser" renders the search page. With the API backend the browser is
+# only started when the fallback is enabled.
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "api").strip().lower()
+BROWSER_FALLBACK = _env_bool("SCRAPER_BROWSER_FALLBACK", True)
+# Point this at fixture_server.py to work offline
+ELDORADO_API_URL = os.getenv("ELDORADO_API_URL", "https://www.eldorado.gg")
+API_TIMEOUT_S = _env_int("SCRAPER_API_TIMEOUT_S", 10)
+
+# Offer extraction: "evaluate" reads the fields in-page; "html.parser",
+# "bs4-lxml", "lxml" and "selectolax" parse page.content() in a thread.
+HTML_PARSER = os.getenv("SCRAPER_HTML_PARSER", "evaluate").strip().lower()
+
+# Pagination limits for /search
+MAX_PAGES_LIMIT = _env_int("SCRAPER_MAX_PAGES_LIMIT", 10)
+# flexibleOffers returns at most 50 offers per page; a larger page would come
+# back short and end pagination early
+MAX_PAGE_SIZE = _env_int("SCRAPER_MAX_PAGE_SIZE", 50)
+
+# Result cache: fresh for CACHE_TTL_S, then served stale for up to
+# CACHE_STALE_S more while a background refresh runs.
+CACHE_TTL_S = _env_int("SCRAPER_CACHE_TTL_S", 120)
+CACHE_STALE_S = _env_int("SCRAPER_CACHE_STALE_S", 600)
+CACHE_MAX_ENTRIES = _env_int("SCRAPER_CACHE_MAX_ENTRIES", 500)
+
+# Pre-warming: re-fetch the most popular searches in the background so they
+# stay fresh in the cache. The budget is in pages per minute; 0 disables it.
+PREWARM_PAGES_PER_MINUTE = _env_int("SCRAPER_PREWARM_PAGES_PER_MINUTE", 12)
+PREWARM_TOP_N = _env_int("SCRAPER_PREWARM_TOP_N", 300)
+PREWARM_MAX_TRACKED = _env_int("SCRAPER_PREWARM_MAX_TRACKED", 2000)
+PREWARM_HALF_LIFE_S = _env_int("SCRAPER_PREWARM_HALF_LIFE_S", 3600)
+# Refresh an entry once it is this far through its TTL
+PREWARM_REFRESH_FRACTION = float(os.getenv("SCRAPER_PREWARM_REFRESH_FRACTION", "0.8"))
+# Optionally seed the ranking with every 字典.txt item (crossed with these
+# mutations) at a low weight, so a fresh process has something to warm.
+PREWARM_SEED_DICTIONARY = _env_bool("SCRAPER_PREWARM_SEED_DICTIONARY", False)
+PREWARM_SEED_MUTATIONS = _env_list("SCRAPER_PREWARM_SEED_MUTATIONS", "none,lava,rainbow,gold,diamond")
+
+# Browser pool: number of warm Chromium processes and how many scrapes a
+# context serves before it is thrown away and rebuilt.
+BROWSER_POOL_SIZE = _env_int("SCRAPER_POOL_SIZE", 2)
+CONTEXT_MAX_USES = _env_int("SCRAPER_CONTEXT_MAX_USES", 50)
+
+# Concurrency: page loads allowed in flight at once, how many searches may
+# wait for a free page, and how long they wait before getting a 503.
+MAX_CONCURRENT_PAGES = _env_int("SCRAPER_MAX_CONCURRENT_PAGES", 6)
+MAX_QUEUE_DEPTH = _env_int("SCRAPER_MAX_QUEUE_DEPTH", 50)
+QUEUE_WAIT_TIMEOUT_S = _env_int("SCRAPER_QUEUE_WAIT_TIMEOUT_S", 30)
+
+# Timeouts (milliseconds, as Playwright expects)
+NAVIGATION_TIMEOUT_MS = _env_int("SCRAPER_NAVIGATION_TIMEOUT_MS", 45000)
+OFFER_WAIT_TIMEOUT_MS = _env_int("SCRAPER_OFFER_WAIT_TIMEOUT_MS", 20000)
+
+# Request blocking: abort downloads the HTML parser never looks at.
+# BLOCK_THIRD_PARTY additionally aborts any host outside ALLOW_DOMAINS.
+RESOURCE_BLOCKING = _env_bool("SCRAPER_RESOURCE_BLOCKING", True)
+BLOCK_RESOURCE_TYPES = _env_list("SCRAPER_BLOCK_TYPES", "image,media,font")
+BLOCK_DOMAINS = _env_list(
+    "SCRAPER_BLOCK_DOMAINS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,"
+    "facebook.net,facebook.com,hotjar.com,clarity.ms,tiktok.com,snapchat.com,"
+    "segment.io,intercom.io,sentry.io,trustpilot.com"
+)
+ALLOW_DOMAINS = _env_list("SCRAPER_ALLOW_DOMAINS", "eldorado.gg")
+BLOCK_THIRD_PARTY = _env_bool("SCRAPER_BLOCK_THIRD_PARTY", False)
+
+# Readiness detection: the page counts as settled when offers rendered and the
+# DOM went quiet, a "no results" marker appeared, the offers XHR came back
+# empty, or the network went idle.
+OFFERS_XHR_PATTERN = os.getenv("SCRAPER_OFFERS_XHR_PATTERN", "/api/flexibleOffers")
+NO_RESULTS_SELECTOR = os.getenv("SCRAPER_NO_RESULTS_SELECTOR", "eld-no-results, .no-results, .empty-state")
+DOM_QUIET_MS = _env_int("SCRAPER_DOM_QUIET_MS", 300)
+DOM_QUIET_MAX_MS = _env_int("SCRAPER_DOM_QUIET_MAX_MS", 3000)
+
+# Upper bound for a single pooled scrape once it has a page
+SCRAPE_JOB_TIMEOUT_S = _env_int("SCRAPER_JOB_TIMEOUT_S", 90)
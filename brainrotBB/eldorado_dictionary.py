@@ -0,0 +1,83 @@
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+from dictionary_file import extract_object
+
+logger = logging.getLogger(__name__)
+
+# 字典.txt holds the rarity -> item -> tree id map and the attribute map as
+# JS object literals, parsed by shared/dictionary_file.py
+DICTIONARY_PATH = os.getenv(
+    "ELDORADO_DICTIONARY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "字典.txt")
+)
+
+# URL slugs used by the search page (steal-a-brainrot-ms=1-plus-bs) mapped
+# to the attribute names the offers API returns.
+MS_SLUG_TO_NAME = {
+    "0": "0",
+    "0-24-ms": "0-24 M/s",
+    "25-49-ms": "25-49 M/s",
+    "50-99-ms": "50-99 M/s",
+    "100-249-ms": "100-249 M/s",
+    "250-499-ms": "250-499 M/s",
+    "500-749-ms": "500-749 M/s",
+    "750-999-ms": "750-999 M/s",
+    "1-plus-bs": "1+ B/s"
+}
+
+@lru_cache(maxsize=1)
+def load_dictionary() -> Dict[str, dict]:
+    with open(DICTIONARY_PATH, encoding="utf-8") as f:
+        text = f.read()
+    data = {
+        "items": extract_object(text, "brainrotDictionary"),
+        "attributes": extract_object(text, "attributeDictionary")
+    }
+    logger.info(f"Loaded Eldorado dictionary with {sum(len(v) for v in data['items'].values())} items.")
+    return data
+
+def _find_key(mapping: dict, name: str) -> Optional[str]:
+    if name in mapping:
+        return name
+    lowered = name.strip().lower()
+    for key in mapping:
+        if key.lower() == lowered:
+            return key
+    return None
+
+def category_tree_id(category: str) -> Optional[str]:
+    """'OG' -> '0-7' (the rarity node of the item tree)."""
+    items = load_dictionary()["items"]
+    key = _find_key(items, category)
+    if key is None:
+        return None
+    first_id = next(iter(items[key].values()))
+    return first_id.rsplit("-", 1)[0]
+
+def item_tree_id(category: Optional[str], item_name: str) -> Optional[str]:
+    """'OG', 'Skibidi Toilet' -> '0-7-3'. Searches every rarity if category is unknown."""
+    items = load_dictionary()["items"]
+    rarities = [category] if category and _find_key(items, category) else list(items)
+    for rarity in rarities:
+        entries = items[_find_key(items, rarity)]
+        key = _find_key(entries, item_name)
+        if key is not None:
+            return entries[key]
+    return None
+
+def mutation_name(slug: str) -> Optional[str]:
+    """'lava' -> 'Lava', 'yin-yang' -> 'Yin-Yang'."""
+    return _find_key(load_dictionary()["attributes"]["Mutations"], slug)
+
+def ms_rate_name(slug: str) -> Optional[str]:
+    """'1-plus-bs' -> '1+ B/s'."""
+    return MS_SLUG_TO_NAME.get(slug.strip().lower())
+
+def attribute_id(group: str, name: str) -> Optional[str]:
+    """('Mutations', 'Lava') -> '1-5'."""
+    values = load_dictionary()["attributes"].get(group, {})
+    key = _find_key(values, name)
+    return values[key] if key is not None else None
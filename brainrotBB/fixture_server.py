@@ -0,0 +1,68 @@
+"""
+Offline stand-in for Eldorado's flexibleOffers endpoint.
+
+Serves JSON files from fixtures/flexible_offers/, one per tradeEnvironmentId
+(e.g. 0-7-3.json), falling back to default.json. The bundled files are
+synthetic (ids like "fx-0000"), written in the {"results": [{"offer": ...,
+"user": ...}]} shape the client expects; that shape and the attributeIdsCsv
+filter are inferred from the site, not checked against a recorded response.
+Paginated with pageIndex/pageSize.
+
+Run it and point the scraper at it:
+    python fixture_server.py
+    ELDORADO_API_URL=http://localhost:6676 python -m uvicorn app:app --port 6674
+"""
+import json
+import os
+from typing import Optional
+
+from fastapi import FastAPI, Query
+
+FIXTURE_DIR = os.getenv(
+    "ELDORADO_FIXTURE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "flexible_offers")
+)
+
+app = FastAPI(title="Eldorado Fixture Server", version="1.0.0")
+
+def load_fixture(tree_id: Optional[str]) -> dict:
+    for name in (tree_id, "default"):
+        if not name:
+            continue
+        path = os.path.join(FIXTURE_DIR, f"{os.path.basename(name)}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    return {"results": []}
+
+def _attribute_ids(entry: dict) -> set:
+    offer = entry.get("offer") or entry
+    return {a.get("value", {}).get("id") for a in offer.get("attributes") or [] if a.get("value", {}).get("id")}
+
+@app.get("/api/flexibleOffers")
+def flexible_offers(
+    gameId: str = "259",
+    category: str = "CustomItem",
+    tradeEnvironmentId: Optional[str] = None,
+    attributeIdsCsv: Optional[str] = None,
+    pageIndex: int = Query(1, ge=1),
+    pageSize: int = Query(24, ge=1, le=100)
+):
+    results = load_fixture(tradeEnvironmentId).get("results", [])
+
+    # Fixtures may carry attribute ids; if they do, honour the filter like the API.
+    if attributeIdsCsv:
+        wanted = set(attributeIdsCsv.split(","))
+        results = [r for r in results if not _attribute_ids(r) or wanted <= _attribute_ids(r)]
+
+    start = (pageIndex - 1) * pageSize
+    return {
+        "results": results[start:start + pageSize],
+        "totalCount": len(results),
+        "pageIndex": pageIndex,
+        "pageSize": pageSize
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=6676)
@@ -0,0 +1,12 @@
+# One implementation for backend/ and brainrotBB/: shared/ms_rates.py at the repo root
+import os
+import sys
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if _ROOT not in sys.path:
+    # Appended, so nothing at the repo root shadows installed packages
+    sys.path.append(_ROOT)
+
+from shared.ms_rates import BUCKETS, bucket_range, filter_offers_by_rate, parse_rate, rate_bucket, to_bucket_slug
+
+__all__ = ["BUCKETS", "bucket_range", "filter_offers_by_rate", "parse_rate", "rate_bucket", "to_bucket_slug"]
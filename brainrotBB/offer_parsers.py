@@ -0,0 +1,150 @@
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Offer markup on the Eldorado search page
+OFFER_TAG = "eld-offer-item"
+TITLE_SELECTOR = ".offer-title"
+PRICE_SELECTOR = "eld-offer-price strong"
+SELLER_SELECTOR = ".seller-details .username"
+
+Parser = Callable[[str], List[Dict[str, str]]]
+
+def _row(title, price, seller) -> Dict[str, str]:
+    return {
+        "title": title or "N/A",
+        "price": price or "N/A",
+        "seller": seller or "N/A"
+    }
+
+def _parse_bs4(html_content: str, features: str) -> List[Dict[str, str]]:
+    soup = BeautifulSoup(html_content, features)
+    offers = []
+    for item in soup.find_all(OFFER_TAG):
+        try:
+            title_elem = item.select_one(TITLE_SELECTOR)
+            price_elem = item.select_one(PRICE_SELECTOR)
+            seller_elem = item.select_one(SELLER_SELECTOR)
+            offers.append(_row(
+                title_elem.get_text(strip=True) if title_elem else None,
+                price_elem.get_text(strip=True) if price_elem else None,
+                seller_elem.get_text(strip=True) if seller_elem else None
+            ))
+        except Exception as e:
+            logger.error(f"Error parsing item: {e}")
+    return offers
+
+def parse_html_parser(html_content: str) -> List[Dict[str, str]]:
+    """BeautifulSoup with the pure-Python html.parser (the original path)."""
+    return _parse_bs4(html_content, "html.parser")
+
+def parse_bs4_lxml(html_content: str) -> List[Dict[str, str]]:
+    """BeautifulSoup on top of the lxml tree builder."""
+    return _parse_bs4(html_content, "lxml")
+
+def _class_xpath(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+_LXML_TITLE = f".//*[{_class_xpath('offer-title')}]"
+_LXML_PRICE = ".//eld-offer-price//strong"
+_LXML_SELLER = f".//*[{_class_xpath('seller-details')}]//*[{_class_xpath('username')}]"
+
+def _lxml_text(nodes) -> str:
+    # Matches BeautifulSoup's get_text(strip=True): strip each text piece, join without separator
+    if not nodes:
+        return None
+    return "".join(t.strip() for t in nodes[0].itertext())
+
+@lru_cache(maxsize=1)
+def _lxml_xpaths():
+    from lxml import etree
+    return etree.XPath(_LXML_TITLE), etree.XPath(_LXML_PRICE), etree.XPath(_LXML_SELLER)
+
+def parse_lxml(html_content: str) -> List[Dict[str, str]]:
+    """Plain lxml with precompiled XPath, no BeautifulSoup tree."""
+    from lxml import html
+
+    title_xp, price_xp, seller_xp = _lxml_xpaths()
+    tree = html.fromstring(html_content)
+    return [
+        _row(_lxml_text(title_xp(item)), _lxml_text(price_xp(item)), _lxml_text(seller_xp(item)))
+        for item in tree.iter(OFFER_TAG)
+    ]
+
+def _selectolax_text(node) -> str:
+    if node is None:
+        return None
+    return node.text(deep=True, separator="", strip=True)
+
+def parse_selectolax(html_content: str) -> List[Dict[str, str]]:
+    """selectolax (Lexbor) CSS queries."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html_content)
+    return [
+        _row(
+            _selectolax_text(item.css_first(TITLE_SELECTOR)),
+            _selectolax_text(item.css_first(PRICE_SELECTOR)),
+            _selectolax_text(item.css_first(SELLER_SELECTOR))
+        )
+        for item in tree.css(OFFER_TAG)
+    ]
+
+PARSERS: Dict[str, Parser] = {
+    "html.parser": parse_html_parser,
+    "bs4-lxml": parse_bs4_lxml,
+    "lxml": parse_lxml,
+    "selectolax": parse_selectolax
+}
+
+# Optional packages each parser needs
+_REQUIRES = {
+    "bs4-lxml": "lxml",
+    "lxml": "lxml",
+    "selectolax": "selectolax"
+}
+
+@lru_cache(maxsize=None)
+def parser_available(name: str) -> bool:
+    module = _REQUIRES.get(name)
+    if module is None:
+        return name in PARSERS
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+def get_parser(name: str) -> Parser:
+    """Returns the named parser, or html.parser if it is unknown or its package is missing."""
+    if name in PARSERS and parser_available(name):
+        return PARSERS[name]
+    logger.warning(f"HTML parser '{name}' unavailable, using html.parser.")
+    return parse_html_parser
+
+# In-page extraction: returns just the offer fields, so page.content() never
+# has to serialise the whole Angular render. Text handling mirrors
+# get_text(strip=True).
+EXTRACT_OFFERS_JS = """
+([offerTag, titleSel, priceSel, sellerSel]) => {
+    const text = (el) => {
+        if (!el) return null;
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        const parts = [];
+        while (walker.nextNode()) parts.push(walker.currentNode.nodeValue.trim());
+        return parts.join("");
+    };
+    return Array.from(document.querySelectorAll(offerTag)).map(item => ({
+        title: text(item.querySelector(titleSel)) || "N/A",
+        price: text(item.querySelector(priceSel)) || "N/A",
+        seller: text(item.querySelector(sellerSel)) || "N/A"
+    }));
+}
+"""
+
+async def extract_offers_in_page(page) -> List[Dict[str, str]]:
+    return await page.evaluate(EXTRACT_OFFERS_JS, [OFFER_TAG, TITLE_SELECTOR, PRICE_SELECTOR, SELLER_SELECTOR])
@@ -0,0 +1,172 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+import config
+from eldorado_dictionary import attribute_id, category_tree_id, item_tree_id, ms_rate_name, mutation_name
+from pagination import fetch_pages
+
+logger = logging.getLogger(__name__)
+
+GAME_ID = "259"
+OFFERS_PATH = "/api/flexibleOffers"
+
+# Largest pageSize flexibleOffers honours
+API_MAX_PAGE_SIZE = 50
+
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£", "CNY": "¥", "JPY": "¥"}
+
+class OffersApiError(Exception):
+    """The JSON API could not answer this query; callers may fall back to the browser."""
+
+class UnknownFilterError(OffersApiError):
+    """
+    A filter value is not in the local Eldorado dictionary. It may simply be
+    newer than the dictionary, so the browser backend still gets to try it.
+    """
+
+def _is_set(value: Optional[str], *empty: str) -> bool:
+    return bool(value) and value not in empty
+
+def build_api_params(filters: dict, page_index: int = 1, page_size: int = 24) -> dict:
+    """
+    Maps the /search filters onto flexibleOffers query params.
+    Uses the same folding as build_search_url: ms_rate '0'/'none' and
+    mutations 'none' mean no filter, item_name 'Other' means category only.
+    """
+    params = {
+        "gameId": GAME_ID,
+        "category": "CustomItem",
+        "pageIndex": str(page_index),
+        "pageSize": str(page_size)
+    }
+
+    category = filters.get("category")
+    item_name = filters.get("item_name")
+    tree_id = None
+    if _is_set(item_name, "Other"):
+        tree_id = item_tree_id(category, item_name)
+        if tree_id is None:
+            raise UnknownFilterError(f"Unknown item '{item_name}'")
+    elif category:
+        tree_id = category_tree_id(category)
+        if tree_id is None:
+            raise UnknownFilterError(f"Unknown category '{category}'")
+    if tree_id:
+        params["tradeEnvironmentId"] = tree_id
+
+    attribute_ids = []
+    ms_rate = filters.get("ms_rate")
+    if _is_set(ms_rate, "0", "none"):
+        name = ms_rate_name(ms_rate)
+        if name is None:
+            raise UnknownFilterError(f"Unknown ms_rate '{ms_rate}'")
+        attribute_ids.append(attribute_id("M/s", name))
+    mutations = filters.get("mutations")
+    if _is_set(mutations, "none"):
+        name = mutation_name(mutations)
+        if name is None:
+            raise UnknownFilterError(f"Unknown mutation '{mutations}'")
+        attribute_ids.append(attribute_id("Mutations", name))
+    if attribute_ids:
+        # Param name inferred from the site's own requests, not a documented
+        # contract; matches_filters re-checks the attributes client-side
+        params["attributeIdsCsv"] = ",".join(a for a in attribute_ids if a)
+
+    return params
+
+def _attribute_names(offer: dict) -> Dict[str, str]:
+    names = {}
+    for attr in offer.get("attributes") or []:
+        value = attr.get("value") or {}
+        if attr.get("name") and value.get("name"):
+            names[attr["name"]] = value["name"]
+    return names
+
+def matches_filters(offer: dict, filters: dict) -> bool:
+    """Client-side attribute check, in case the API ignores attributeIdsCsv."""
+    ms_rate = filters.get("ms_rate")
+    mutations = filters.get("mutations")
+    want_ms = ms_rate_name(ms_rate) if _is_set(ms_rate, "0", "none") else None
+    want_mutation = mutation_name(mutations) if _is_set(mutations, "none") else None
+    if not want_ms and not want_mutation:
+        return True
+    attrs = _attribute_names(offer)
+    if want_ms and attrs.get("M/s") != want_ms:
+        return False
+    if want_mutation and attrs.get("Mutations") != want_mutation:
+        return False
+    return True
+
+def format_price(price: dict) -> str:
+    amount = price.get("amount")
+    if amount is None:
+        return "N/A"
+    currency = price.get("currency") or ""
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol:
+        return f"{symbol}{amount:,.2f}"
+    return f"{amount:,.2f} {currency}".strip()
+
+def to_offer_row(entry: dict) -> Dict[str, str]:
+    """Shapes an API result like the HTML parser output: title, price, seller."""
+    offer = entry.get("offer") or entry
+    user = entry.get("user") or {}
+    return {
+        "title": offer.get("offerTitle") or "N/A",
+        "price": format_price(offer.get("pricePerUnit") or {}),
+        "seller": user.get("username") or "N/A"
+    }
+
+class OffersApiClient:
+    """Async client for Eldorado's public flexibleOffers JSON endpoint."""
+
+    name = "api"
+
+    def __init__(self, base_url: str = config.ELDORADO_API_URL, timeout: float = config.API_TIMEOUT_S):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                headers={"User-Agent": config.USER_AGENT, "Accept": "application/json"}
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_page(self, params: dict) -> dict:
+        await self.start()
+        try:
+            response = await self._client.get(OFFERS_PATH, params=params)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise OffersApiError(f"flexibleOffers request failed: {e}") from e
+
+    async def search_page(self, filters: dict, page_index: int = 1, page_size: int = 24) -> Tuple[List[Dict[str, str]], int]:
+        """Returns one page of matching rows plus the unfiltered result count."""
+        params = build_api_params(filters, page_index, page_size)
+        logger.info(f"Querying offers API: {params}")
+        data = await self.fetch_page(params)
+        results = data.get("results") if isinstance(data, dict) else data
+        if results is None:
+            raise OffersApiError("Unexpected flexibleOffers response shape")
+        rows = [
+            to_offer_row(entry)
+            for entry in results
+            if matches_filters(entry.get("offer") or entry, filters)
+        ]
+        return rows, len(results)
+
+    async def search(self, filters: dict, max_pages: int = 1, page_size: int = 24) -> List[Dict[str, str]]:
+        # A larger pageSize comes back capped, which fetch_pages would read as the last page
+        page_size = min(page_size, API_MAX_PAGE_SIZE)
+        return await fetch_pages(lambda i: self.search_page(filters, i, page_size), max_pages, page_size)
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A page fetcher takes a 1-based page index and returns (rows, raw_count).
+# raw_count is the number of offers the source returned before any
+# client-side filtering, so a filtered-down page is not mistaken for the last.
+PageFetcher = Callable[[int], Awaitable[Tuple[List[Dict[str, str]], int]]]
+
+def offer_key(row: Dict[str, str]) -> tuple:
+    return (row.get("title"), row.get("price"), row.get("seller"))
+
+def dedupe_offers(rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    seen = set()
+    unique = []
+    for row in rows:
+        key = offer_key(row)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(row)
+    return unique
+
+async def fetch_pages(fetch_page: PageFetcher, max_pages: int, page_size: int) -> List[Dict[str, str]]:
+    """
+    Fetches pages 1..max_pages concurrently and merges them in page order.
+    The first page that comes back short marks the end: later pages still in
+    flight are cancelled and their results ignored. Errors on page 1 propagate
+    (so a fallback backend can take over); errors on later pages truncate.
+    """
+    if max_pages <= 1:
+        rows, _ = await fetch_page(1)
+        return rows
+
+    tasks = {i: asyncio.ensure_future(fetch_page(i)) for i in range(1, max_pages + 1)}
+    index_of = {task: i for i, task in tasks.items()}
+    last_page = max_pages
+    pending = set(tasks.values())
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = index_of[task]
+                if task.exception() is not None:
+                    if i == 1:
+                        raise task.exception()
+                    logger.warning(f"Page {i} failed, truncating results: {task.exception()}")
+                    last_page = min(last_page, i - 1)
+                elif task.result()[1] < page_size:
+                    last_page = min(last_page, i)
+            for task in list(pending):
+                if index_of[task] > last_page:
+                    task.cancel()
+                    pending.discard(task)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    rows = []
+    for i in range(1, last_page + 1):
+        rows.extend(tasks[i].result()[0])
+    logger.info(f"Fetched {last_page} page(s), {len(rows)} offer(s) before dedupe.")
+    return dedupe_offers(rows)
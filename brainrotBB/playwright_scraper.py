@@ -1,106 +1,121 @@
+import asyncio
 import urllib.parse
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import time
+from playwright.async_api import async_playwright
 import logging
+from typing import Optional
+
+import config
+from browser_pool import BrowserPool, PoolSaturated
+from offer_parsers import extract_offers_in_page, get_parser
+from readiness import OffersResponseWatcher, wait_until_ready
+from resource_blocking import blocker_for, blocking_stats, install_blocker
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def fetch_search_results(filters: dict):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
-        page = context.new_page()
-        
-        # Build query parameters
-        params = {}
-        ms_rate = filters.get("ms_rate")
-        if ms_rate and ms_rate != "0" and ms_rate != "none":
-            params["steal-a-brainrot-ms"] = ms_rate
-        
-        mutations = filters.get("mutations")
-        if mutations and mutations != "none":
-            params["steal-a-brainrot-mutations"] = mutations
-            
-        category = filters.get("category")
-        item_name = filters.get("item_name")
+SEARCH_URL = "https://www.eldorado.gg/steal-a-brainrot-brainrots/i/259"
+
+def build_search_url(filters: dict, page_index: int = 1, page_size: int = 24) -> str:
+    # Build query parameters
+    params = {}
+    ms_rate = filters.get("ms_rate")
+    if ms_rate and ms_rate != "0" and ms_rate != "none":
+        params["steal-a-brainrot-ms"] = ms_rate
+    
+    mutations = filters.get("mutations")
+    if mutations and mutations != "none":
+        params["steal-a-brainrot-mutations"] = mutations
         
-        # Only set te_v params if category/item are provided
-        if category or item_name:
-             params["te_v0"] = "Brainrot"
-             if category:
-                 params["te_v1"] = category
-             if item_name and item_name != "Other":
-                 params["te_v2"] = item_name
+    category = filters.get("category")
+    item_name = filters.get("item_name")
+    
+    # Only set te_v params if category/item are provided
+    if category or item_name:
+         params["te_v0"] = "Brainrot"
+         if category:
+             params["te_v1"] = category
+         if item_name and item_name != "Other":
+             params["te_v2"] = item_name
 
-        params["gamePageOfferIndex"] = "1"
-        params["gamePageOfferSize"] = "24"
+    params["gamePageOfferIndex"] = str(page_index)
+    params["gamePageOfferSize"] = str(page_size)
 
-        query_string = urllib.parse.urlencode(params)
-        url = f"https://www.eldorado.gg/steal-a-brainrot-brainrots/i/259?{query_string}"
-        
-        logger.info(f"Navigating to: {url}")
+    query_string = urllib.parse.urlencode(params)
+    return f"{SEARCH_URL}?{query_string}"
+
+async def scrape_page(page, url: str):
+    """
+    Navigates an already-open page to `url` and parses the offers.
+    Raises on navigation errors so the browser pool can recycle the context.
+    """
+    logger.info(f"Navigating to: {url}")
+    blocker = blocker_for(page)
+    if blocker is not None:
+        blocker.reset()
+    with OffersResponseWatcher(page) as watcher:
+        await page.goto(url, timeout=config.NAVIGATION_TIMEOUT_MS, wait_until="domcontentloaded")
+        logger.info(f"Page loaded. URL: {page.url}")
         
+        # Finish as soon as the results settle instead of sleeping a fixed time
+        signal = await wait_until_ready(page, watcher)
+        if signal == "timeout":
+            logger.warning("Timeout waiting for results to settle. Validating page content...")
+    
+    if blocker is not None:
+        report = blocker.report()
+        blocking_stats.record(report)
+        logger.info(f"Blocked {report['blocked']} request(s), ~{report['estimated_bytes_saved'] // 1024} KB saved.")
+    
+    if config.HTML_PARSER == "evaluate":
+        # Pull just the offer fields out of the live DOM
+        return await extract_offers_in_page(page)
+
+    content = await page.content()
+    # HTML parsing is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(parse_content, content)
+
+async def fetch_search_results(filters: dict, pool: Optional[BrowserPool] = None, page_index: int = 1, page_size: int = 24):
+    """
+    Scrapes one search results page for `filters`.
+    With a pool the scrape runs on a warm page; without one (scripts, CLI)
+    a throwaway browser is launched for this single call.
+    Errors propagate instead of turning into an empty result, so a failed
+    scrape is never cached as "0 offers": PoolSaturated becomes a 503, other
+    failures a 500 or a fallback to another backend.
+    """
+    url = build_search_url(filters, page_index, page_size)
+
+    if pool is not None:
+        try:
+            async with pool.acquire() as page:
+                return await asyncio.wait_for(scrape_page(page, url), config.SCRAPE_JOB_TIMEOUT_S)
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            logger.error(f"Error in Playwright fetch: {e}")
+            raise
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=config.HEADLESS)
+        context = await browser.new_context(user_agent=config.USER_AGENT)
+        page = await context.new_page()
+        await install_blocker(page)
         try:
-            response = page.goto(url, timeout=45000, wait_until="domcontentloaded")
-            logger.info(f"Page loaded. URL: {page.url}")
-            
-            # Wait for specific elements that indicate offers are loaded
-            try:
-                # Wait for at least one offer item or the 'no results' message
-                page.wait_for_selector("eld-offer-item", timeout=20000)
-                logger.info("Offer items detected.")
-            except:
-                logger.warning("Timeout waiting for 'eld-offer-item'. Validating page content...")
-            
-            # Allow a bit more time for any final hydration
-            time.sleep(2)
-            
-            content = page.content()
-            return parse_content(content)
-            
+            return await scrape_page(page, url)
         except Exception as e:
             logger.error(f"Error in Playwright fetch: {e}")
-            return []
+            raise
         finally:
-            browser.close()
+            await browser.close()
 
 def parse_content(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
-    offers = []
-    
-    offer_items = soup.find_all("eld-offer-item")
-    
-    if not offer_items:
+    offers = get_parser(config.HTML_PARSER)(html_content)
+    if not offers:
         logger.info("No offers found in HTML.")
-        return []
-
-    for item in offer_items:
-        try:
-            title_elem = item.select_one(".offer-title")
-            price_elem = item.select_one("eld-offer-price strong")
-            seller_elem = item.select_one(".seller-details .username")
-            
-            title = title_elem.get_text(strip=True) if title_elem else "N/A"
-            price = price_elem.get_text(strip=True) if price_elem else "N/A"
-            seller = seller_elem.get_text(strip=True) if seller_elem else "N/A"
-            
-            offers.append({
-                "title": title,
-                "price": price,
-                "seller": seller
-            })
-        except Exception as e:
-            logger.error(f"Error parsing item: {e}")
-            continue
-            
     return offers
 
 if __name__ == "__main__":
-    results = fetch_search_results("Toilet")
+    results = asyncio.run(fetch_search_results({"item_name": "Skibidi Toilet"}))
     print(f"Found {len(results)} offers:")
     for res in results[:5]:
         print(res)
\ No newline at end of file
@@ -0,0 +1,192 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import config
+from browser_pool import PoolSaturated
+from eldorado_dictionary import load_dictionary
+from result_cache import SearchCache, canonical_key
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class _Tracked:
+    def __init__(self, filters: dict, max_pages: int, page_size: int):
+        self.filters = dict(filters)
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.score = 0.0
+        self.updated_at = time.monotonic()
+        self.rank = 0.0
+
+class PopularityTracker:
+    """
+    Exponentially decayed request counts per canonical search key.
+    A query's score halves every `half_life` seconds without traffic; only the
+    `max_tracked` highest scores are kept.
+
+    Every score decays at the same rate, so the order of two entries never
+    changes with time: log2(score) + updated_at / half_life ranks them for
+    good. Eviction pops the lowest rank off a heap; entries that were bumped
+    since they were pushed are skipped (lazy deletion).
+    """
+
+    def __init__(self, half_life: float = config.PREWARM_HALF_LIFE_S, max_tracked: int = config.PREWARM_MAX_TRACKED):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._entries: Dict[tuple, _Tracked] = {}
+        self._heap: List[Tuple[float, tuple]] = []
+
+    def _decayed(self, entry: _Tracked, now: float) -> float:
+        return entry.score * 0.5 ** ((now - entry.updated_at) / self.half_life)
+
+    def record(self, key: tuple, filters: dict, max_pages: int, page_size: int, weight: float = 1.0):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Tracked(filters, max_pages, page_size)
+        entry.score = self._decayed(entry, now) + weight
+        entry.updated_at = now
+        entry.rank = math.log2(entry.score) + now / self.half_life
+        heapq.heappush(self._heap, (entry.rank, key))
+        while len(self._entries) > self.max_tracked:
+            rank, coldest = heapq.heappop(self._heap)
+            if self._entries.get(coldest) is not None and self._entries[coldest].rank == rank:
+                del self._entries[coldest]
+        if len(self._heap) > 4 * max(self.max_tracked, len(self._entries)):
+            # Drop superseded heap items now and then
+            self._heap = [(e.rank, k) for k, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, limit: Optional[int] = None) -> List[tuple]:
+        """[(key, entry, score)] hottest first."""
+        now = time.monotonic()
+        ranked = sorted(
+            ((key, entry, self._decayed(entry, now)) for key, entry in self._entries.items()),
+            key=lambda item: item[2],
+            reverse=True
+        )
+        return ranked[:limit] if limit else ranked
+
+    def __len__(self):
+        return len(self._entries)
+
+def seed_from_dictionary(tracker: PopularityTracker, mutations: List[str] = config.PREWARM_SEED_MUTATIONS, weight: float = 0.1):
+    """Adds every named item x mutation at `weight`, well below a single real request."""
+    seeded = 0
+    for category, items in load_dictionary()["items"].items():
+        for item_name in items:
+            if item_name == "Other":
+                continue
+            for mutation in mutations or ["none"]:
+                filters = {"ms_rate": None, "mutations": mutation, "category": category, "item_name": item_name}
+                tracker.record(canonical_key(filters), filters, 1, 24, weight)
+                seeded += 1
+    logger.info(f"Seeded pre-warm ranking with {seeded} dictionary combination(s).")
+
+class PrewarmScheduler:
+    """
+    Background task that keeps the hottest searches warm in the result cache.
+    Each tick it picks the most popular key whose cache entry is missing or
+    close to going stale and re-fetches it. It then sleeps long enough to stay
+    within `pages_per_minute`, charging one page per fetched page.
+    """
+
+    def __init__(
+        self,
+        backend,
+        cache: SearchCache,
+        flights: SingleFlight,
+        tracker: PopularityTracker,
+        pages_per_minute: int = config.PREWARM_PAGES_PER_MINUTE,
+        top_n: int = config.PREWARM_TOP_N,
+        refresh_fraction: float = config.PREWARM_REFRESH_FRACTION
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.flights = flights
+        self.tracker = tracker
+        self.pages_per_minute = pages_per_minute
+        self.top_n = top_n
+        self.refresh_fraction = refresh_fraction
+        self._task: Optional[asyncio.Task] = None
+        # Keys that just failed are skipped until this monotonic time
+        self._cooldown: Dict[tuple, float] = {}
+
+        self.prewarmed = 0
+        self.errors = 0
+        self.saturated = 0
+
+    def _next_due(self):
+        refresh_after = self.cache.ttl * self.refresh_fraction
+        now = time.monotonic()
+        for key, entry, _ in self.tracker.top(self.top_n):
+            if self._cooldown.get(key, 0) > now:
+                continue
+            cached = self.cache.peek(key)
+            if cached is None or cached[1] >= refresh_after:
+                return key, entry
+        return None
+
+    async def _refresh(self, key: tuple, entry: _Tracked):
+        results = await self.flights.do(
+            key, lambda: self.backend.search(entry.filters, entry.max_pages, entry.page_size)
+        )
+        self.cache.put(key, results)
+        self._cooldown.pop(key, None)
+        self.prewarmed += 1
+        logger.info(f"Pre-warmed {key} ({len(results)} offers).")
+
+    async def _run(self):
+        interval = 60.0 / self.pages_per_minute
+        while True:
+            due = self._next_due()
+            if due is None:
+                await asyncio.sleep(interval)
+                continue
+            key, entry = due
+            try:
+                await self._refresh(key, entry)
+            except PoolSaturated:
+                # User traffic has the browsers; back off and try later
+                self.saturated += 1
+                await asyncio.sleep(interval * 5)
+                continue
+            except Exception as e:
+                self.errors += 1
+                self._cooldown[key] = time.monotonic() + self.cache.ttl
+                logger.warning(f"Pre-warm of {key} failed: {e}")
+            await asyncio.sleep(interval * max(1, entry.max_pages))
+
+    def start(self):
+        if self.pages_per_minute <= 0 or self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"Pre-warm scheduler started ({self.pages_per_minute} pages/min, top {self.top_n}).")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "pages_per_minute": self.pages_per_minute,
+            "tracked": len(self.tracker),
+            "prewarmed": self.prewarmed,
+            "errors": self.errors,
+            "saturated": self.saturated,
+            "hottest": [
+                {"filters": entry.filters, "score": round(score, 2)}
+                for _, entry, score in self.tracker.top(5)
+            ]
+        }
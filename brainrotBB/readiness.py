@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Resolves once the DOM has not changed for `quietMs`, or after `maxMs` at most.
+_QUIESCENCE_JS = """
+([quietMs, maxMs]) => new Promise(resolve => {
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quietMs);
+    });
+    const cap = setTimeout(done, maxMs);
+    function done() {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve();
+    }
+    observer.observe(document.body || document.documentElement, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(done, quietMs);
+})
+"""
+
+class ReadinessStats:
+    """Counts which signal ended each page wait and the time spent waiting."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.total_ms: Dict[str, float] = {}
+
+    def record(self, signal: str, elapsed_ms: float):
+        self.counts[signal] = self.counts.get(signal, 0) + 1
+        self.total_ms[signal] = self.total_ms.get(signal, 0.0) + elapsed_ms
+
+    def snapshot(self) -> dict:
+        return {
+            signal: {"count": count, "avg_ms": round(self.total_ms[signal] / count, 1)}
+            for signal, count in self.counts.items()
+        }
+
+readiness_stats = ReadinessStats()
+
+class OffersResponseWatcher:
+    """
+    Captures the page's own offers XHR. Attach before page.goto(), since the
+    response can arrive while navigation is still in progress.
+    """
+
+    def __init__(self, page, pattern: str = config.OFFERS_XHR_PATTERN):
+        self.page = page
+        self.pattern = pattern
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def _on_response(self, response):
+        if self.pattern in response.url and not self.future.done():
+            self.future.set_result(response)
+
+    def __enter__(self):
+        self.page.on("response", self._on_response)
+        return self
+
+    def __exit__(self, *exc):
+        self.page.remove_listener("response", self._on_response)
+        if not self.future.done():
+            self.future.cancel()
+
+async def _settle(page):
+    await page.evaluate(_QUIESCENCE_JS, [config.DOM_QUIET_MS, config.DOM_QUIET_MAX_MS])
+
+async def _offers_rendered(page) -> str:
+    await page.wait_for_selector("eld-offer-item", timeout=0)
+    await _settle(page)
+    return "offers"
+
+async def _no_results_marker(page) -> str:
+    await page.wait_for_selector(config.NO_RESULTS_SELECTOR, timeout=0)
+    return "no-results"
+
+async def _offers_xhr(page, watcher: OffersResponseWatcher) -> Optional[str]:
+    response = await watcher.future
+    try:
+        data = await response.json()
+    except Exception:
+        return None
+    results = data.get("results") if isinstance(data, dict) else data
+    if results == []:
+        return "xhr-empty"
+    # Non-empty payload: the DOM still has to render it, leave that to _offers_rendered
+    return None
+
+async def _network_idle(page) -> str:
+    await page.wait_for_load_state("networkidle")
+    await _settle(page)
+    return "network-idle"
+
+async def wait_until_ready(page, watcher: Optional[OffersResponseWatcher] = None, timeout_ms: int = config.OFFER_WAIT_TIMEOUT_MS) -> str:
+    """
+    Races the readiness signals and returns the name of the first conclusive one
+    ('offers', 'no-results', 'xhr-empty', 'network-idle' or 'timeout').
+    Call after page.goto(..., wait_until="domcontentloaded").
+    """
+    started = time.perf_counter()
+    tasks = {
+        asyncio.ensure_future(_offers_rendered(page)),
+        asyncio.ensure_future(_no_results_marker(page)),
+        asyncio.ensure_future(_network_idle(page))
+    }
+    if watcher is not None:
+        tasks.add(asyncio.ensure_future(_offers_xhr(page, watcher)))
+
+    signal = "timeout"
+    pending = tasks
+    deadline = started + timeout_ms / 1000
+    try:
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            conclusive = [t.result() for t in done if not t.cancelled() and t.exception() is None and t.result()]
+            if conclusive:
+                signal = conclusive[0]
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    readiness_stats.record(signal, elapsed_ms)
+    logger.info(f"Page ready via '{signal}' after {elapsed_ms:.0f} ms.")
+    return signal
@@ -0,0 +1,118 @@
+import logging
+import urllib.parse
+import weakref
+from typing import Dict, Iterable, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Blocked requests are never downloaded, so their real size is unknown. These
+# rough per-type averages for the Eldorado search page turn block counts into a
+# bytes-saved estimate.
+ESTIMATED_BYTES = {
+    "image": 45_000,
+    "media": 250_000,
+    "font": 35_000,
+    "stylesheet": 20_000,
+    "script": 60_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 10_000
+}
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+class BlockingProfile:
+    """What to abort: resource types, tracker domains, optionally all third parties."""
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = config.BLOCK_RESOURCE_TYPES,
+        deny_domains: Iterable[str] = config.BLOCK_DOMAINS,
+        allow_domains: Iterable[str] = config.ALLOW_DOMAINS,
+        block_third_party: bool = config.BLOCK_THIRD_PARTY
+    ):
+        self.block_types = frozenset(block_types)
+        self.deny_domains = tuple(deny_domains)
+        self.allow_domains = tuple(allow_domains)
+        self.block_third_party = block_third_party
+
+    def reason_to_block(self, url: str, resource_type: str) -> Optional[str]:
+        """Returns why a request should be aborted, or None to let it through."""
+        if resource_type in self.block_types:
+            return f"type:{resource_type}"
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if _host_matches(host, self.deny_domains):
+            return "domain"
+        if self.block_third_party and host and not _host_matches(host, self.allow_domains):
+            return "third-party"
+        return None
+
+class RouteBlocker:
+    """Route handler for one page; counters are reset at the start of each scrape."""
+
+    def __init__(self, profile: BlockingProfile):
+        self.profile = profile
+        self.reset()
+
+    def reset(self):
+        self.allowed = 0
+        self.blocked: Dict[str, int] = {}
+        self.bytes_saved = 0
+
+    async def handle(self, route):
+        request = route.request
+        reason = self.profile.reason_to_block(request.url, request.resource_type)
+        if reason is None:
+            self.allowed += 1
+            await route.continue_()
+            return
+        self.blocked[reason] = self.blocked.get(reason, 0) + 1
+        self.bytes_saved += ESTIMATED_BYTES.get(request.resource_type, ESTIMATED_BYTES["other"])
+        await route.abort("blockedbyclient")
+
+    def report(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "blocked": sum(self.blocked.values()),
+            "blocked_by_reason": dict(self.blocked),
+            "estimated_bytes_saved": self.bytes_saved
+        }
+
+class BlockingStats:
+    """Process-wide totals across all scrapes."""
+
+    def __init__(self):
+        self.pages = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+
+    def record(self, report: dict):
+        self.pages += 1
+        self.blocked += report["blocked"]
+        self.bytes_saved += report["estimated_bytes_saved"]
+
+    def snapshot(self) -> dict:
+        return {
+            "pages": self.pages,
+            "blocked_requests": self.blocked,
+            "estimated_bytes_saved": self.bytes_saved
+        }
+
+blocking_stats = BlockingStats()
+
+_blockers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+async def install_blocker(page, profile: Optional[BlockingProfile] = None) -> Optional[RouteBlocker]:
+    """Routes every request of `page` through a RouteBlocker (no-op when blocking is disabled)."""
+    if not config.RESOURCE_BLOCKING:
+        return None
+    blocker = RouteBlocker(profile or BlockingProfile())
+    await page.route("**/*", blocker.handle)
+    _blockers[page] = blocker
+    return blocker
+
+def blocker_for(page) -> Optional[RouteBlocker]:
+    return _blockers.get(page)
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+def _fold(value: Optional[str], *empty: str) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value == "" or value in empty:
+        return None
+    return value
+
+def canonical_key(filters: dict, max_pages: int = 1, page_size: int = 24) -> tuple:
+    """
+    Cache key for a search. Folds values the same way fetch_search_results
+    does: ms_rate '0'/'none', mutations 'none' and item_name 'Other' are all
+    "no filter", and case does not matter.
+    """
+    return (
+        _fold(filters.get("ms_rate"), "0", "none"),
+        _fold(filters.get("mutations"), "none"),
+        _fold(filters.get("category")),
+        _fold(filters.get("item_name"), "other"),
+        max_pages,
+        page_size
+    )
+
+class SearchCache:
+    """
+    LRU cache of search results with a freshness TTL and a stale window.
+    Within `ttl` an entry is served as a HIT. Within `ttl + stale_ttl` it is
+    served as STALE while one background task refreshes it. Older entries
+    count as a MISS and are fetched inline.
+
+    Only successful fetches are stored: a fetch that raises caches nothing,
+    and a failed background refresh leaves the existing entry in place.
+    """
+
+    def __init__(self, ttl: float = config.CACHE_TTL_S, stale_ttl: float = config.CACHE_STALE_S, maxsize: int = config.CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Tuple[object, float]]" = OrderedDict()
+        self._refreshing = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    def _store(self, key: tuple, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def peek(self, key: tuple) -> Optional[Tuple[object, float]]:
+        """Returns (value, age_seconds) without touching counters or LRU order."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def put(self, key: tuple, value):
+        self._store(key, value)
+
+    def _schedule_refresh(self, key: tuple, fetch: Callable[[], Awaitable[object]]):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await fetch()
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Background refresh failed for {key}, keeping the stale entry: {e}")
+            else:
+                self._store(key, value)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+    async def get_or_fetch(self, key: tuple, fetch: Callable[[], Awaitable[object]]) -> Tuple[object, float, str]:
+        """Returns (value, age_seconds, status) where status is HIT, STALE or MISS."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, age, "HIT"
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._schedule_refresh(key, fetch)
+                return value, age, "STALE"
+            del self._entries[key]
+
+        self.misses += 1
+        value = await fetch()
+        self._store(key, value)
+        return value, 0.0, "MISS"
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "refreshing": len(self._refreshing),
+            "refresh_errors": self.refresh_errors
+        }
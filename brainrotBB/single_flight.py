@@ -0,0 +1,12 @@
+# One implementation for backend/ and brainrotBB/: shared/single_flight.py at the repo root
+import os
+import sys
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if _ROOT not in sys.path:
+    # Appended, so nothing at the repo root shadows installed packages
+    sys.path.append(_ROOT)
+
+from shared.single_flight import SingleFlight
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,12 @@
+import json
+import re
+
+# 字典.txt holds the rarity -> item -> tree id map and the attribute map as
+# JS object literals; both bodies are plain JSON.
+
+def extract_object(text: str, name: str) -> dict:
+    """Parses the body of `const <name> = {...};` from the dictionary file."""
+    match = re.search(r"const " + name + r"\s*=\s*(\{.*?\n\});", text, re.S)
+    if not match:
+        raise ValueError(f"'{name}' not found in dictionary file")
+    return json.loads(match.group(1))
@@ -0,0 +1,74 @@
+import json
+import os
+import re
+from bisect import bisect_right
+from typing import Iterable, List, Optional
+
+# Used by both backend/ and brainrotBB/ (through their ms_rates.py shims)
+MS_BUCKETS_PATH = os.getenv(
+    "MS_BUCKETS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ms_buckets.json")
+)
+
+_SUFFIXES = {"": 1, "k": 1e3, "m": 1e6, "b": 1e9, "t": 1e12}
+
+# "4.4B/s", "150 M/s", "1,5k/s". The "/s" is required so prices and trait
+# counts in a title are never read as a rate.
+RATE_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s*([kmbt])?\s*/\s*s\b", re.I)
+
+def _load_buckets(path: str = MS_BUCKETS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return sorted((float(bound), slug) for bound, slug in json.load(f)["buckets"])
+
+# Eldorado M/s buckets: (lower bound per second, URL slug). Sorted by bound;
+# a rate falls in the last bucket whose bound is <= it.
+BUCKETS = _load_buckets()
+_BOUNDS = [bound for bound, _ in BUCKETS]
+_SLUGS = [slug for _, slug in BUCKETS]
+_SLUG_RANGES = {
+    slug: (bound, BUCKETS[i + 1][0] if i + 1 < len(BUCKETS) else float("inf"))
+    for i, (bound, slug) in enumerate(BUCKETS)
+}
+
+def parse_rate(text: Optional[str]) -> Optional[float]:
+    """'4.4B/s' -> 4.4e9, '150M/s' -> 1.5e8; None if there is no rate in the text."""
+    if not text:
+        return None
+    match = RATE_PATTERN.search(text)
+    if not match:
+        return None
+    number = float(match.group(1).replace(",", "."))
+    return number * _SUFFIXES[(match.group(2) or "").lower()]
+
+def rate_bucket(rate: float) -> str:
+    """4.4e9 -> '1-plus-bs'."""
+    return _SLUGS[max(bisect_right(_BOUNDS, rate) - 1, 0)]
+
+def bucket_range(slug: str):
+    """'100-249-ms' -> (1e8, 2.5e8); upper bound exclusive."""
+    return _SLUG_RANGES.get(slug)
+
+def to_bucket_slug(ms_rate: Optional[str]) -> Optional[str]:
+    """
+    Accepts a bucket slug ('1-plus-bs', '0', 'none' pass through) or a display
+    rate ('4.4B/s'); returns the slug, or None if it is neither.
+    """
+    if not ms_rate:
+        return None
+    value = ms_rate.strip().lower()
+    if value in _SLUG_RANGES or value in ("0", "none"):
+        return value
+    rate = parse_rate(ms_rate)
+    return rate_bucket(rate) if rate is not None else None
+
+def filter_offers_by_rate(offers: Iterable[dict], low: float, high: float) -> List[dict]:
+    """
+    Drops offers whose title states a rate outside [low, high). Offers
+    without a readable rate in the title are kept.
+    """
+    kept = []
+    for offer in offers:
+        rate = parse_rate(offer.get("title"))
+        if rate is None or low <= rate < high:
+            kept.append(offer)
+    return kept